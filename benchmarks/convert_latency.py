@@ -0,0 +1,247 @@
+"""
+Benchmark of the end-to-end latency of ``/api/v1/convert`` for a small file,
+converted inline or through the asynchronous path::
+
+    poetry run python benchmarks/convert_latency.py [--rows 2000] [--runs 7]
+
+The ASGI app is driven in-process with local stand-ins for the storage, the
+publisher and the notifications, and conversions run in the real executor.
+The asynchronous path is timed from ``/convert`` through the push of its
+message to ``/_pubsub`` until ``/tasks/{task_id}`` reports it done, which
+leaves out the Pub/Sub delivery and the client's polling interval it adds in
+production.
+"""
+
+import argparse
+import asyncio
+import base64
+import collections.abc
+import contextlib
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import typing
+
+import injector
+from api import dependencies, factory, ports, typings
+from api.domain import util
+
+KEYS = {"concept:id": "case", "concept:name": "activity", "time:timestamp": "ts"}
+
+
+class LocalStorage(ports.Storage):
+    """Storage in a local directory, for ``gs://bucket/name`` and ``name``."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def _path(self, path: str) -> str:
+        return os.path.join(self.root, path.rsplit("/", 1)[-1])
+
+    async def upload_by_text(self, path: str, text: bytes, content_type: str) -> str:
+        with open(self._path(path), "wb") as file:
+            file.write(text)
+        return path
+
+    async def stat(self, path: str) -> typings.ObjectInfo | None:
+        try:
+            stat = os.stat(self._path(path))
+        except FileNotFoundError:
+            return None
+        return typings.ObjectInfo(
+            size=stat.st_size, generation=str(stat.st_mtime_ns), etag=""
+        )
+
+    async def generate_signed_url(
+        self, path: str, mimetype: str, method: str = "PUT"
+    ) -> str:
+        return f"file://{self._path(path)}"
+
+    @contextlib.contextmanager
+    def open_read(self, uri: str) -> collections.abc.Iterator[typing.IO[bytes]]:
+        with open(self._path(uri), "rb") as file:
+            yield file
+
+    @contextlib.contextmanager
+    def open_write(
+        self, path: str, content_type: str
+    ) -> collections.abc.Iterator[typing.IO[bytes]]:
+        with open(f"{self._path(path)}.part", "wb") as file:
+            yield file
+        os.replace(f"{self._path(path)}.part", self._path(path))
+
+    def warm_up(self) -> None:
+        pass
+
+
+class Publisher(ports.MessagePublisher):
+    """Keeps the messages, to be pushed to ``/_pubsub`` by hand."""
+
+    def __init__(self) -> None:
+        self.messages: list[bytes] = []
+
+    async def publish(self, message: typings.Message, topic: str | None = None) -> None:
+        self.messages.append(util.encode_message(message))
+
+    async def publish_many(
+        self,
+        messages: collections.abc.Iterable[typings.Message],
+        topic: str | None = None,
+    ) -> None:
+        for message in messages:
+            await self.publish(message, topic)
+
+    def warm_up(self) -> None:
+        pass
+
+
+class Notification(ports.Notification):
+    async def send(self, email: str, template_file: str, **kwargs: typing.Any) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalModule(injector.Module):
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    @injector.provider
+    @injector.singleton
+    def provide_storage(self) -> ports.Storage:
+        return LocalStorage(self.root)
+
+    @injector.provider
+    @injector.singleton
+    def provide_publisher(self) -> ports.MessagePublisher:
+        return Publisher()
+
+    @injector.provider
+    @injector.singleton
+    def provide_notification(self) -> ports.Notification:
+        return Notification()
+
+
+async def call(
+    app: typing.Any, method: str, path: str, body: typing.Any = None
+) -> typing.Any:
+    """Send a request, as a server would, and return its JSON response."""
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8080),
+    }
+    received = False
+    chunks: list[bytes] = []
+
+    async def receive() -> dict[str, typing.Any]:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": data, "more_body": False}
+        # No disconnect, until cancelled once the response is sent.
+        waiter: asyncio.Future[dict[str, typing.Any]]
+        waiter = asyncio.get_running_loop().create_future()
+        return await waiter
+
+    async def send(message: dict[str, typing.Any]) -> None:
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return json.loads(b"".join(chunks) or b"null")
+
+
+async def convert(app: typing.Any, publisher: Publisher, inline: bool) -> float:
+    """Convert the file, returning the seconds until its result is available."""
+    start = time.perf_counter()
+    response = await call(
+        app,
+        "POST",
+        "/api/v1/convert",
+        {
+            "file": "https://storage.googleapis.com/bucket/events.csv",
+            "email_address": "someone@example.com",
+            "keys": KEYS,
+        },
+    )
+    if not inline:
+        message = base64.b64encode(publisher.messages.pop()).decode("ascii")
+        await call(
+            app,
+            "POST",
+            "/api/v1/_pubsub",
+            {"message": {"data": message, "messageId": "1"}, "subscription": "s"},
+        )
+        response = await call(app, "GET", f"/api/v1/tasks/{response['task_id']}")
+    elapsed = time.perf_counter() - start
+    if response["status"] != "done":
+        raise RuntimeError(f"Conversion not done: {response}")
+    return elapsed
+
+
+async def measure(root: str, inline: bool, runs: int) -> list[float]:
+    os.environ["_INLINE_CONVERSION_MAX_SIZE"] = str(1 << 30 if inline else 0)
+    container = injector.Injector(
+        (
+            dependencies.SettingsModule(),
+            dependencies.MemoryModule(),
+            dependencies.UtilModule(),
+            LocalModule(root),
+        )
+    )
+    app = factory.create_app(container)
+    publisher = typing.cast(Publisher, container.get(ports.MessagePublisher))
+    async with app.router.lifespan_context(app):
+        # The first conversion starts the executor's worker process.
+        await convert(app, publisher, inline)
+        return [await convert(app, publisher, inline) for _ in range(runs)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update(_TASK_STORE="memory", _RESULT_CACHE_SIZE="0")
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "events.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("case;activity;ts;resource\n")
+            for i in range(args.rows):
+                file.write(
+                    f"case-{i // 10};activity-{i % 7};"
+                    f"2023-01-{i % 28 + 1:02d} {i % 24:02d}:00:00;r{i % 13}\n"
+                )
+        size = os.path.getsize(path) / 1000
+        print(f"{args.rows:,} rows, {size:.0f} KB, median of {args.runs} runs")
+        for name, inline in (("inline", True), ("async", False)):
+            timings = asyncio.run(measure(root, inline, args.runs))
+            print(f"{name:<7} {statistics.median(timings) * 1000:6.1f} ms")
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+
+if __name__ == "__main__":
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        logging.basicConfig(level=logging.INFO, stream=devnull)
+        sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of the requests per second served on ``/api/v1/healthz``.
+
+The ASGI app is driven in-process, so only the app and its middleware are
+measured, with INFO logs formatted into ``/dev/null``::
+
+    poetry run python benchmarks/healthz.py [requests]
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+import typing
+
+from api import dependencies, factory
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/api/v1/healthz",
+    "raw_path": b"/api/v1/healthz",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"localhost"), (b"user-agent", b"benchmark")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("localhost", 8080),
+}
+
+
+async def request(app: typing.Any) -> None:
+    """Send a request, as a server would, waiting for the whole response."""
+    received = False
+
+    async def receive() -> dict[str, typing.Any]:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # No disconnect, until cancelled once the response is sent.
+        waiter: asyncio.Future[dict[str, typing.Any]]
+        waiter = asyncio.get_running_loop().create_future()
+        return await waiter
+
+    async def send(message: dict[str, typing.Any]) -> None:
+        pass
+
+    await app(dict(SCOPE), receive, send)
+
+
+async def main(requests: int) -> None:
+    app = factory.create_app(dependencies.create_container())
+    for _ in range(requests // 10):
+        await request(app)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request(app)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{requests / elapsed:,.0f} requests/s, "
+        f"{elapsed / requests * 1e6:.0f} us per request"
+    )
+
+
+if __name__ == "__main__":
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        logging.basicConfig(level=logging.INFO, stream=devnull)
+        asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
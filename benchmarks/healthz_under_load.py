@@ -0,0 +1,115 @@
+"""
+Benchmark of the latency of ``/api/v1/healthz`` while a large file converts.
+
+A synthetic CSV is converted in the ``ConversionExecutor`` while the ASGI app
+is polled in-process every ``--interval-ms``, as a load balancer would::
+
+    poetry run python benchmarks/healthz_under_load.py [--rows 500000] [--max-ms 250]
+
+It fails when the slowest health check takes longer than ``--max-ms``. With
+``--inline`` the conversion runs on the event loop instead, as it used to,
+to see the checks stall.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from api import dependencies, factory
+from api.domain import conversion
+from api.domain.instrumentation import ConversionStats
+from api.executor import ConversionExecutor
+from healthz import request
+
+KEYS = {"concept:id": "case", "concept:name": "activity", "time:timestamp": "ts"}
+
+
+def write_csv(path: str, rows: int) -> None:
+    """Write ``rows`` events of cases of ten events each."""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("case;activity;ts;resource;amount\n")
+        for i in range(rows):
+            file.write(
+                f"case-{i // 10};activity-{i % 7};"
+                f"2023-{i % 12 + 1:02d}-{i % 28 + 1:02d} {i % 24:02d}:{i % 60:02d}:00;"
+                f"r{i % 13};{i % 1000}\n"
+            )
+
+
+async def poll(
+    interval: float, converting: asyncio.Future[ConversionStats]
+) -> list[float]:
+    """
+    Send a health check every ``interval`` seconds until the conversion ends.
+
+    Latencies are counted from when each check was due, so a blocked event
+    loop shows up as it would to a load balancer.
+    """
+    app = factory.create_app(dependencies.create_container())
+    await request(app)
+    latencies = []
+    due = time.perf_counter()
+    while not converting.done():
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await request(app)
+        now = time.perf_counter()
+        latencies.append(now - due)
+        due = max(due + interval, now)
+    return latencies
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--max-ms", type=float, default=250)
+    parser.add_argument("--interval-ms", type=float, default=50)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "events.csv")
+        write_csv(source, args.rows)
+        options = conversion.ConversionOptions(keys=KEYS)
+        target = os.path.join(directory, "events.xes")
+        executor = ConversionExecutor(max_workers=1)
+        # Start the worker process before measuring.
+        await executor.run(os.getpid)
+        try:
+            loop = asyncio.get_running_loop()
+            if args.inline:
+                converting = loop.create_future()
+                polling = asyncio.create_task(poll(args.interval_ms / 1000, converting))
+                await asyncio.sleep(0.1)
+                converting.set_result(conversion.convert_file(source, target, options))
+            else:
+                converting = asyncio.ensure_future(
+                    executor.run(conversion.convert_file, source, target, options)
+                )
+                polling = asyncio.create_task(poll(args.interval_ms / 1000, converting))
+            latencies = await polling
+            stats = await converting
+        finally:
+            executor.shutdown()
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    slowest = latencies_ms[-1] if latencies_ms else 0.0
+    print(f"converted {stats.rows:,} rows in {sum(stats.stages.values()):.1f} s")
+    print(f"health checks:  {len(latencies_ms)}")
+    if latencies_ms:
+        print(f"median latency: {statistics.median(latencies_ms):.1f} ms")
+    print(f"max latency:    {slowest:.1f} ms")
+    if slowest > args.max_ms or not latencies_ms:
+        print(f"Health checks stalled, max allowed is {args.max_ms:.0f} ms.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        logging.basicConfig(level=logging.INFO, stream=devnull)
+        sys.exit(asyncio.run(main()))
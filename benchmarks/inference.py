@@ -0,0 +1,66 @@
+"""
+Benchmark of the column type inference on a full batch of rows, with the
+columns that used to send the patterns into catastrophic backtracking::
+
+    poetry run python benchmarks/inference.py [--rows 10000] [--max-ms 1000]
+
+Every column is checked for the type it should get, and the run fails when a
+column takes longer than ``--max-ms``, or is interrupted after ten times as
+long in case inference hangs.
+"""
+
+import argparse
+import signal
+import sys
+import time
+import types
+
+from api.domain import inference
+
+
+def columns(rows: int) -> dict[str, tuple[list[str], str]]:
+    """Columns of ``rows`` values, along with the type they should be given."""
+    numbers = [str(10_000 + i) for i in range(rows)]
+    return {
+        "ints": (numbers, inference.INT),
+        "ints then n/a": ([*numbers, "N/A"], inference.STRING),
+        "ints then dash": ([*numbers, "-"], inference.STRING),
+        "comma decimals": ([*numbers, "1,5"], inference.STRING),
+        "floats then n/a": ([f"{n}.{n}" for n in numbers] + ["N/A"], inference.STRING),
+        "floats": ([f"{n}.5e3" for n in numbers], inference.FLOAT),
+        "long ids": ([str(10**19 + i) for i in range(rows)], inference.STRING),
+        "zero padded codes": ([f"{i:07d}" for i in range(rows)], inference.STRING),
+        "dates then n/a": (["2023-01-01 10:00:00"] * rows + ["N/A"], inference.STRING),
+    }
+
+
+def timeout(signum: int, frame: types.FrameType | None) -> None:
+    raise TimeoutError()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--max-ms", type=float, default=1_000)
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGALRM, timeout)
+    failed = False
+    for name, (values, expected) in columns(args.rows).items():
+        signal.alarm(max(1, int(args.max_ms * 10 / 1000)))
+        start = time.perf_counter()
+        try:
+            kind = inference.infer_type(values)
+        except TimeoutError:
+            kind = "timed out"
+        finally:
+            signal.alarm(0)
+        elapsed = (time.perf_counter() - start) * 1000
+        ok = kind == expected and elapsed <= args.max_ms
+        failed = failed or not ok
+        print(f"{name:<18} {kind:<9} {elapsed:8.1f} ms{'' if ok else '  FAILED'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
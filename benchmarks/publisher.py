@@ -0,0 +1,116 @@
+"""
+Benchmark of the latency and throughput of the Pub/Sub ``MessagePublisher``,
+against a local client that answers each request after ``--rtt-ms``::
+
+    poetry run python benchmarks/publisher.py [--messages 10000] [--max-overhead-ms 2]
+
+Lone publishes, as ``/convert`` makes them, are timed with each
+``--max-latency`` setting, then ``--messages`` concurrent ones to count the
+requests they are batched in. Fails when a lone publish with the default
+setting takes more than ``--max-overhead-ms`` over the round trip.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import typing
+import uuid
+
+from api.adapters.google import pubsub
+from api.routers import schemas
+
+
+class Client:
+    """Stands in for ``PublisherAsyncClient``, counting its requests."""
+
+    def __init__(self, rtt: float) -> None:
+        self.rtt = rtt
+        self.requests = 0
+
+    async def publish(self, messages: list[typing.Any], topic: str) -> None:
+        self.requests += 1
+        await asyncio.sleep(self.rtt)
+
+
+def message() -> schemas.ConvertAsyncTask:
+    return schemas.ConvertAsyncTask(
+        task_id=uuid.uuid4(),
+        url="gs://bucket/events.csv",
+        email_address="someone@example.com",
+        keys={"concept:id": "case", "concept:name": "activity"},
+    )
+
+
+def publisher(rtt: float, max_latency: float | None) -> pubsub.MessagePublisher:
+    publisher = pubsub.MessagePublisher("project", "", "topic")
+    if max_latency is not None:
+        publisher.max_latency = max_latency
+    publisher.__dict__["client"] = Client(rtt)
+    return publisher
+
+
+async def lone(rtt: float, max_latency: float | None, runs: int) -> float:
+    """Median seconds of a publish, one at a time."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await publisher(rtt, max_latency).publish(message())
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+async def concurrent(
+    rtt: float, max_latency: float | None, messages: int
+) -> tuple[float, int]:
+    """
+    Seconds and requests to publish ``messages`` concurrently, each started in
+    its own iteration of the event loop as requests to ``/convert`` would be.
+    """
+    instance = publisher(rtt, max_latency)
+    start = time.perf_counter()
+    publishing = []
+    for _ in range(messages):
+        publishing.append(asyncio.ensure_future(instance.publish(message())))
+        await asyncio.sleep(0)
+    await asyncio.gather(*publishing)
+    elapsed = time.perf_counter() - start
+    return elapsed, typing.cast(Client, instance.client).requests
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=5)
+    parser.add_argument("--max-overhead-ms", type=float, default=2)
+    parser.add_argument(
+        "--max-latency", type=float, nargs="*", default=[0.001, 0.01, 0.05]
+    )
+    args = parser.parse_args()
+
+    rtt = args.rtt_ms / 1000
+    print(f"round trip {args.rtt_ms:.1f} ms, {args.messages:,} concurrent messages")
+    print(
+        f"{'max_latency':<12} {'lone publish':>12} {'messages/s':>12} {'requests':>9}"
+    )
+    default = 0.0
+    for max_latency in [None, *args.max_latency]:
+        latency = await lone(rtt, max_latency, args.runs) * 1000
+        elapsed, requests = await concurrent(rtt, max_latency, args.messages)
+        name = "default" if max_latency is None else f"{max_latency * 1000:g} ms"
+        print(
+            f"{name:<12} {latency:>9.1f} ms "
+            f"{args.messages / elapsed:>12,.0f} {requests:>9,}"
+        )
+        if max_latency is None:
+            default = latency
+    if default - args.rtt_ms > args.max_overhead_ms:
+        print(f"A lone publish waits more than {args.max_overhead_ms:.1f} ms.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,109 @@
+"""
+Benchmark of the cold start: importing ``api.asgi`` and serving a first
+``/api/v1/healthz``, each run in a fresh interpreter::
+
+    poetry run python benchmarks/startup.py [--runs 5] [--max-ms 1500]
+
+Also lists the heavy libraries loaded by then, which should stay out of the
+startup until an adapter needs them. With ``--max-ms`` it fails when the
+median time to the first response is above it, to catch regressions.
+"""
+
+import argparse
+import dataclasses
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = (
+    "aiohttp",
+    "google.api_core",
+    "google.cloud.storage",
+    "google.oauth2",
+    "google.pubsub_v1",
+    "google_crc32c",
+)
+
+PROBE = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+from api import asgi
+imported = time.perf_counter()
+
+
+async def first_request():
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/v1/healthz",
+        "raw_path": b"/api/v1/healthz", "root_path": "", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8080),
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        return await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        pass
+
+    await asgi.app(scope, receive, send)
+
+asyncio.run(first_request())
+served = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "first_response": served - start,
+    "heavy": [name for name in HEAVY_MODULES if name in sys.modules],
+}))
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Sample:
+    import_ms: float
+    first_response_ms: float
+    heavy: list[str]
+
+
+def probe() -> Sample:
+    """Start a fresh interpreter and time its startup."""
+    output = subprocess.run(
+        [sys.executable, "-c", f"HEAVY_MODULES = {HEAVY_MODULES!r}\n{PROBE}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+    return Sample(
+        import_ms=result["import"] * 1000,
+        first_response_ms=result["first_response"] * 1000,
+        heavy=result["heavy"],
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    samples = [probe() for _ in range(args.runs)]
+    imports = statistics.median(s.import_ms for s in samples)
+    first = statistics.median(s.first_response_ms for s in samples)
+    heavy = sorted({name for s in samples for name in s.heavy})
+    print(f"import api.asgi: {imports:.0f} ms (median of {args.runs})")
+    print(f"first response:  {first:.0f} ms")
+    print(f"heavy modules:   {', '.join(heavy) or 'none'}")
+    if args.max_ms is not None and first > args.max_ms:
+        print(f"Slower than {args.max_ms:.0f} ms.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
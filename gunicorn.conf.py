@@ -0,0 +1,24 @@
+"""
+Gunicorn settings, picked up from the working directory.
+
+Keeps the Prometheus metrics of the workers (see ``api.metrics``) consistent:
+the files of a previous run are dropped on start and those of workers that
+exit stop counting towards live gauges.
+"""
+
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
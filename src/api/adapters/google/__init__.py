@@ -1,7 +1,11 @@
 from .cloud_storage import CloudStorage
-from .pubsub import MessagePublisher
+from .pubsub import MessageConsumer, MessagePublisher
+from .ranged_reader import ChecksumMismatch, RangedReader
 
 __all__ = (
+    "ChecksumMismatch",
     "CloudStorage",
+    "MessageConsumer",
     "MessagePublisher",
+    "RangedReader",
 )
@@ -1,42 +1,154 @@
 """Module with the implementation of cloud storage."""
 
 import asyncio
+import collections
+import collections.abc
+import contextlib
 import datetime
 import functools
-import os
+import gzip
+import io
+import logging
+import time
+import typing
 
+from google.api_core import exceptions
 from google.cloud import storage  # type: ignore[attr-defined]
 from google.oauth2 import service_account
 
-from api import ports
+from api import ports, typings
+
+from .ranged_reader import RangedReader
+
+logger = logging.getLogger(__name__)
+
+SIGNED_URL_EXPIRATION = datetime.timedelta(days=3)
 
 
 class CloudStorage(ports.Storage):
-    """Implementation of google's cloud storage."""
-
-    def __init__(self, project_id: str, storage_path: str, creds_path: str):
-        credentials = None
-        if creds_path:
-            credentials = service_account.Credentials.from_service_account_file(
-                creds_path
-            )
-        self.client = storage.Client(project=project_id, credentials=credentials)
+    """
+    Implementation of google's cloud storage.
+
+    Instances can be pickled, which sends only the configuration, so the
+    streaming methods can be used from worker processes.
+
+    The client is created on first use, keeping it out of the startup.
+    Signed urls are cached until ``signed_url_margin`` seconds before they
+    expire, and signed right on the event loop when the credentials hold a
+    private key, since signing is then local and quick.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        storage_path: str,
+        creds_path: str,
+        chunk_size: int = 8 * 1024 * 1024,
+        download_chunk_size: int = 16 * 1024 * 1024,
+        download_concurrency: int = 4,
+        signed_url_margin: float = 86_400,
+        signed_url_cache_size: int = 4096,
+    ):
+        self.project_id = project_id
         self.storage_path = storage_path
-        self.file_path = "/tmp"
+        self.creds_path = creds_path
+        self.chunk_size = chunk_size
+        self.download_chunk_size = download_chunk_size
+        self.download_concurrency = download_concurrency
+        self.signed_url_margin = signed_url_margin
+        self.signed_url_cache_size = signed_url_cache_size
+        self._signed_urls: collections.OrderedDict[
+            tuple[str, str, str], tuple[float, str]
+        ] = collections.OrderedDict()
 
-    async def download(self, uri: str, file_name: str) -> str:
-        """Download file from GCS."""
-        file_gcs_path = uri
-        path_tmp = f"{self.file_path}/{file_name}"
-        await asyncio.to_thread(
-            functools.partial(self._download_sync, file_gcs_path, path_tmp)
+    @functools.cached_property
+    def client(self) -> storage.Client:
+        """Client of the storage, created on first use."""
+        return storage.Client(project=self.project_id, credentials=self._credentials)
+
+    @functools.cached_property
+    def _credentials(self) -> service_account.Credentials | None:
+        if not self.creds_path:
+            return None
+        credentials: service_account.Credentials = (
+            service_account.Credentials.from_service_account_file(self.creds_path)
         )
-        return path_tmp
+        return credentials
+
+    @property
+    def _signs_locally(self) -> bool:
+        return self._credentials is not None
+
+    def warm_up(self) -> None:
+        self.client  # noqa: B018
+
+    def __getstate__(self) -> dict[str, typing.Any]:
+        return {
+            "project_id": self.project_id,
+            "storage_path": self.storage_path,
+            "creds_path": self.creds_path,
+            "chunk_size": self.chunk_size,
+            "download_chunk_size": self.download_chunk_size,
+            "download_concurrency": self.download_concurrency,
+            "signed_url_margin": self.signed_url_margin,
+            "signed_url_cache_size": self.signed_url_cache_size,
+        }
+
+    def __setstate__(self, state: dict[str, typing.Any]) -> None:
+        self.__init__(**state)  # type: ignore[misc]
 
-    def _download_sync(self, gcs_path: str, path_tmp: str) -> None:
-        """Download file from GCS."""
-        with open(path_tmp, "wb") as file:
-            self.client.download_blob_to_file(gcs_path, file)
+    @contextlib.contextmanager
+    def open_read(self, uri: str) -> collections.abc.Iterator[typing.IO[bytes]]:
+        """
+        Stream a file from GCS, fetching ``download_chunk_size`` ranges with
+        ``download_concurrency`` requests in parallel.
+
+        Ranges are fetched as stored, so files uploaded with ``Content-Encoding:
+        gzip`` are decompressed here, as GCS would when serving them whole.
+
+        :raises ranged_reader.ChecksumMismatch: once the file was read, if its
+            crc32c doesn't match.
+        """
+        blob = storage.Blob.from_string(uri, client=self.client)
+        blob.reload()
+        raw = RangedReader(
+            blob,
+            chunk_size=self.download_chunk_size,
+            concurrency=self.download_concurrency,
+        )
+        with io.BufferedReader(raw, buffer_size=1024 * 1024) as reader:
+            if blob.content_encoding == "gzip":
+                with gzip.GzipFile(fileobj=reader, mode="rb") as decompressed:
+                    yield typing.cast(typing.IO[bytes], decompressed)
+            else:
+                yield typing.cast(typing.IO[bytes], reader)
+
+    @contextlib.contextmanager
+    def open_write(
+        self, path: str, content_type: str
+    ) -> collections.abc.Iterator[typing.IO[bytes]]:
+        """Stream a file into GCS through a resumable upload."""
+        blob = self.client.bucket(self.storage_path).blob(path)
+        writer = storage.fileio.BlobWriter(
+            blob, chunk_size=self.chunk_size, content_type=content_type
+        )
+        try:
+            yield typing.cast(typing.IO[bytes], writer)
+        except BaseException:
+            # Closing the writer would finalize the upload with whatever was
+            # written so far, replacing the previous object; the client has no
+            # way to abort, so close just its buffer, which leaves the writer
+            # closed and the resumable session abandoned.
+            buffer = getattr(writer, "_buffer", None)
+            if buffer is None:
+                logger.warning(
+                    "Can't abort the upload of %s, it may be finalized partially.",
+                    path,
+                )
+            else:
+                buffer.close()
+            raise
+        writer.close()
 
     async def upload_by_text(self, path: str, text: bytes, content_type: str) -> str:
         """Upload file to GCS by text."""
@@ -46,27 +158,49 @@ class CloudStorage(ports.Storage):
         )
         return str(blob.id.rsplit("/", 1)[0])
 
-    async def upload_by_file(self, path: str, file_path: str) -> str:
-        """Upload file to GCS by file."""
-        blob = self.client.bucket(self.storage_path).blob(path)
-        await asyncio.to_thread(functools.partial(blob.upload_from_filename, file_path))
-        blob_id: str = blob.id
-        end_path: str = blob_id.rsplit("/", 1)[0]
-        os.remove(file_path)
-        return end_path
+    async def stat(self, path: str) -> typings.ObjectInfo | None:
+        """Fetch the metadata of a file, by ``gs://`` uri or path in the bucket."""
+        if path.startswith("gs://"):
+            blob = storage.Blob.from_string(path, client=self.client)
+        else:
+            blob = self.client.bucket(self.storage_path).blob(path)
+        try:
+            await asyncio.to_thread(blob.reload)
+        except exceptions.NotFound:
+            return None
+        return typings.ObjectInfo(
+            size=int(blob.size), generation=str(blob.generation), etag=str(blob.etag)
+        )
 
     async def generate_signed_url(
         self, path: str, mimetype: str, method: str = "PUT"
     ) -> str:
+        key = (path, method, mimetype)
+        now = time.time()
+        cached = self._signed_urls.get(key)
+        if cached is not None and cached[0] > now:
+            self._signed_urls.move_to_end(key)
+            return cached[1]
+
+        sign = functools.partial(self._sign, path, mimetype, method)
+        # Without a private key the url is signed through the IAM API.
+        url = sign() if self._signs_locally else await asyncio.to_thread(sign)
+        reuse_until = (
+            now + SIGNED_URL_EXPIRATION.total_seconds() - self.signed_url_margin
+        )
+        if reuse_until > now:
+            self._signed_urls[key] = (reuse_until, url)
+            while len(self._signed_urls) > self.signed_url_cache_size:
+                self._signed_urls.popitem(last=False)
+        return url
+
+    def _sign(self, path: str, mimetype: str, method: str) -> str:
         blob = self.client.bucket(self.storage_path).blob(path)
-        response: str = await asyncio.to_thread(
-            functools.partial(
-                blob.generate_signed_url,
-                method=method,
-                expiration=datetime.timedelta(days=3),
-                version="v4",
-                content_type=mimetype if method != "GET" else None,
-                headers={"x-goog-resumable": "start"} if method == "POST" else None,
-            )
+        response: str = blob.generate_signed_url(
+            method=method,
+            expiration=SIGNED_URL_EXPIRATION,
+            version="v4",
+            content_type=mimetype if method != "GET" else None,
+            headers={"x-goog-resumable": "start"} if method == "POST" else None,
         )
         return response
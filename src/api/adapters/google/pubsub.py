@@ -2,41 +2,206 @@
 Module with the implementation of pubsub
 """
 
+import asyncio
+import collections.abc
+import concurrent.futures
 import dataclasses
-import json
+import functools
+import logging
 
 import google.pubsub_v1 as pubsub
+from google.cloud import pubsub_v1  # type: ignore[attr-defined]
 from google.oauth2 import service_account
 
 from api import ports, typings
 from api.domain import util
 
+logger = logging.getLogger(__name__)
+
+
+def _credentials(creds_path: str) -> service_account.Credentials | None:
+    if not creds_path:
+        return None
+    credentials: service_account.Credentials = (
+        service_account.Credentials.from_service_account_file(creds_path)
+    )
+    return credentials
+
+
+@dataclasses.dataclass
+class _Batch:
+    timer: asyncio.TimerHandle
+    messages: list[pubsub.PubsubMessage] = dataclasses.field(default_factory=list)
+    futures: list[asyncio.Future[None]] = dataclasses.field(default_factory=list)
+    size: int = 0
+
 
 class MessagePublisher(ports.MessagePublisher):
     """
     Implementation of google's pubsub.
+
+    Messages are published in batches, per topic: a batch is sent once it has
+    ``max_messages`` messages or ``max_bytes`` bytes, or ``max_latency``
+    seconds after its first message, and ``publish`` returns once the batch of
+    its message is sent.
+
+    A ``max_latency`` of 0 still batches the messages published in the same
+    iteration of the event loop, such as those of ``publish_many``, without
+    delaying a lone message. A longer one batches more messages published
+    concurrently, but delays every publish by up to that long.
     """
 
-    def __init__(self, project_id: str, creds_path: str, topic: str):
-        credentials = None
-        if creds_path:
-            credentials = service_account.Credentials.from_service_account_file(
-                creds_path
-            )
-        self.client = pubsub.PublisherAsyncClient(credentials=credentials)
+    def __init__(
+        self,
+        project_id: str,
+        creds_path: str,
+        topic: str,
+        max_messages: int = 100,
+        max_bytes: int = 1_000_000,
+        max_latency: float = 0,
+    ):
+        self.creds_path = creds_path
         self.project_id = project_id
-        self.topic_path = self.client.topic_path(project_id, topic)
+        self.topic_path = pubsub.PublisherAsyncClient.topic_path(project_id, topic)
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self._batches: dict[str, _Batch] = {}
+        self._sending: set[asyncio.Task[None]] = set()
+
+    @functools.cached_property
+    def client(self) -> pubsub.PublisherAsyncClient:
+        """Client of the topics, created on first use."""
+        return pubsub.PublisherAsyncClient(credentials=_credentials(self.creds_path))
+
+    def warm_up(self) -> None:
+        self.client  # noqa: B018
 
     async def publish(self, message: typings.Message, topic: str | None = None) -> None:
-        topic_path = (
-            self.topic_path
-            if not topic
-            else self.client.topic_path(self.project_id, topic)
+        await self._add(self._topic_path(topic), util.encode_message(message))
+
+    async def publish_many(
+        self,
+        messages: collections.abc.Iterable[typings.Message],
+        topic: str | None = None,
+    ) -> None:
+        topic_path = self._topic_path(topic)
+        await asyncio.gather(
+            *(self._add(topic_path, util.encode_message(m)) for m in messages)
         )
-        pubsub_message = pubsub.PubsubMessage(
-            data=json.dumps(
-                dataclasses.asdict(message),  # type: ignore[call-overload]
-                cls=util.UUIDEncoder,
-            ).encode("utf-8")
+
+    def _topic_path(self, topic: str | None) -> str:
+        if not topic:
+            return self.topic_path
+        return str(pubsub.PublisherAsyncClient.topic_path(self.project_id, topic))
+
+    def _add(self, topic_path: str, data: bytes) -> asyncio.Future[None]:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(topic_path)
+        if batch is not None and batch.size + len(data) > self.max_bytes:
+            self._flush(topic_path)
+            batch = None
+        if batch is None:
+            batch = self._batches[topic_path] = _Batch(
+                timer=loop.call_later(self.max_latency, self._flush, topic_path)
+            )
+        future: asyncio.Future[None] = loop.create_future()
+        batch.messages.append(pubsub.PubsubMessage(data=data))
+        batch.futures.append(future)
+        batch.size += len(data)
+        if len(batch.messages) >= self.max_messages or batch.size >= self.max_bytes:
+            self._flush(topic_path)
+        return future
+
+    def _flush(self, topic_path: str) -> None:
+        batch = self._batches.pop(topic_path, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.create_task(self._send(topic_path, batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, topic_path: str, batch: _Batch) -> None:
+        try:
+            await self.client.publish(messages=batch.messages, topic=topic_path)
+        except Exception as exc:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_result(None)
+
+
+class MessageConsumer(ports.MessageConsumer):
+    """
+    Implementation of google's pubsub streaming pull.
+
+    Flow control keeps at most ``max_messages`` messages (and ``max_bytes``
+    bytes) outstanding, which are handled ``concurrency`` at a time; the client
+    keeps extending their ack deadlines while they are handled, for up to
+    ``max_lease_duration`` seconds.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        creds_path: str,
+        subscription: str,
+        concurrency: int = 1,
+        max_messages: int = 1,
+        max_bytes: int = 100 * 1024 * 1024,
+        max_lease_duration: int = 3600,
+    ):
+        self.creds_path = creds_path
+        self.subscription_path = pubsub_v1.SubscriberClient.subscription_path(
+            project_id, subscription
+        )
+        self.concurrency = concurrency
+        self.flow_control = pubsub_v1.types.FlowControl(
+            max_messages=max_messages,
+            max_bytes=max_bytes,
+            max_lease_duration=max_lease_duration,
+        )
+
+    @functools.cached_property
+    def client(self) -> pubsub_v1.SubscriberClient:
+        """Client of the subscriptions, created on first use."""
+        return pubsub_v1.SubscriberClient(credentials=_credentials(self.creds_path))
+
+    async def consume(self, handler: ports.message_consumer.Handler) -> None:
+        loop = asyncio.get_running_loop()
+
+        # Runs in the client's threads, handing the message to the event loop.
+        def callback(message: pubsub_v1.subscriber.message.Message) -> None:
+            delivery = typings.Delivery(
+                message_id=message.message_id,
+                data=message.data,
+                attempt=message.delivery_attempt,
+            )
+            future = asyncio.run_coroutine_threadsafe(handler(delivery), loop)
+            try:
+                future.result()
+            except Exception:
+                logger.exception("Failed to handle message %s.", message.message_id)
+                message.nack()
+            else:
+                message.ack()
+
+        streaming = self.client.subscribe(
+            self.subscription_path,
+            callback,
+            flow_control=self.flow_control,
+            scheduler=pubsub_v1.subscriber.scheduler.ThreadScheduler(
+                concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix="subscriber"
+                )
+            ),
         )
-        await self.client.publish(messages=[pubsub_message], topic=topic_path)
+        try:
+            await asyncio.wrap_future(streaming)
+        finally:
+            streaming.cancel()
+            await asyncio.to_thread(streaming.result)
@@ -0,0 +1,89 @@
+"""Module with a parallel ranged reader of GCS objects."""
+
+import base64
+import collections
+import concurrent.futures
+import io
+import typing
+
+import google_crc32c
+
+
+class ChecksumMismatch(OSError):
+    """Raised when what was read doesn't match the checksum of the object."""
+
+
+class RangedReader(io.RawIOBase):
+    """
+    Reads a GCS object by fetching ``chunk_size`` ranges in parallel.
+
+    Up to ``concurrency`` ranges are fetched ahead of the reader, so reading is
+    usually served from memory and peaks at ``concurrency * chunk_size``
+    bytes. Every range is pinned to the generation of ``blob``, which must be
+    loaded, and the crc32c of the whole object is checked once it was read.
+    """
+
+    def __init__(self, blob: typing.Any, chunk_size: int, concurrency: int) -> None:
+        super().__init__()
+        self.blob = blob
+        self.size: int = blob.size or 0
+        self.chunk_size = chunk_size
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="ranged-reader"
+        )
+        self._offsets = iter(range(0, self.size, chunk_size))
+        self._pending: collections.deque[concurrent.futures.Future[bytes]] = (
+            collections.deque()
+        )
+        self._chunk = memoryview(b"")
+        self._checksum: typing.Any = google_crc32c.Checksum()  # type: ignore[no-untyped-call]
+        for _ in range(concurrency):
+            self._fetch_next()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: typing.Any) -> int:
+        if not self._chunk:
+            if not self._pending:
+                self._verify()
+                return 0
+            chunk = self._pending.popleft().result()
+            self._fetch_next()
+            self._checksum.update(chunk)
+            self._chunk = memoryview(chunk)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
+        super().close()
+
+    def _fetch_next(self) -> None:
+        start = next(self._offsets, None)
+        if start is not None:
+            end = min(start + self.chunk_size, self.size) - 1
+            self._pending.append(self._pool.submit(self._fetch, start, end))
+
+    def _fetch(self, start: int, end: int) -> bytes:
+        data: bytes = self.blob.download_as_bytes(
+            start=start,
+            end=end,
+            raw_download=True,
+            checksum=None,
+            if_generation_match=self.blob.generation,
+        )
+        return data
+
+    def _verify(self) -> None:
+        expected = self.blob.crc32c
+        if expected is None:
+            return
+        actual = base64.b64encode(self._checksum.digest()).decode("utf-8")
+        if actual != expected:
+            raise ChecksumMismatch(
+                f"crc32c of {self.blob.name} is {expected}, read {actual}."
+            )
@@ -3,5 +3,13 @@ Module of memory adapters.
 """
 
 from .memory_storage import MemoryStorage
+from .message_queue import MessageQueue
+from .result_cache import ResultCache
+from .sqlite_storage import SQLiteStorage
 
-__all__ = ("MemoryStorage",)
+__all__ = (
+    "MemoryStorage",
+    "MessageQueue",
+    "ResultCache",
+    "SQLiteStorage",
+)
@@ -2,6 +2,8 @@
 Module containing memory storage implementation.
 """
 
+import collections
+import time
 import typing
 import uuid
 
@@ -11,19 +13,56 @@ from api import ports
 class MemoryStorage(ports.MemoryStorage):
     """
     Memory Storage implementation.
+
+    Local to the process. Values expire ``ttl`` seconds after being set
+    (unless given their own ttl) and the least recently set ones are evicted
+    past ``max_entries``.
     """
 
-    def __init__(self) -> None:
-        self._storage: dict[str | uuid.UUID, typing.Any] = {}
+    def __init__(self, max_entries: int = 100_000, ttl: float = 86_400) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._storage: collections.OrderedDict[
+            str | uuid.UUID, tuple[float, typing.Any]
+        ] = collections.OrderedDict()
 
     def get(self, key: str | uuid.UUID) -> typing.Any:
         """
-        Get a value from the storage.
+        Get a value from the storage, ``None`` if it's missing or expired.
+        """
+        entry = self._storage.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._storage[key]
+            return None
+        return entry[1]
+
+    def set(
+        self, key: str | uuid.UUID, value: typing.Any, ttl: float | None = None
+    ) -> None:
+        """
+        Set a value on the storage, for ``ttl`` seconds if given.
+        """
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._storage[key] = (expires, value)
+        self._storage.move_to_end(key)
+        while len(self._storage) > self.max_entries:
+            self._storage.popitem(last=False)
+
+    def add(
+        self, key: str | uuid.UUID, value: typing.Any, ttl: float | None = None
+    ) -> bool:
+        """
+        Set a value unless the key already has one.
         """
-        return self._storage.get(key, "")
+        if self.get(key) is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
 
-    def set(self, key: str | uuid.UUID, value: typing.Any) -> None:
+    def delete(self, key: str | uuid.UUID) -> None:
         """
-        Set a value on the storage.
+        Remove a value from the storage.
         """
-        self._storage[key] = value
+        self._storage.pop(key, None)
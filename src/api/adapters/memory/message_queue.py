@@ -0,0 +1,86 @@
+"""
+Module containing the in memory message queue.
+"""
+
+import asyncio
+import collections.abc
+import dataclasses
+import logging
+import uuid
+
+from api import ports, typings
+from api.domain import util
+
+logger = logging.getLogger(__name__)
+
+
+class MessageQueue(ports.MessagePublisher, ports.MessageConsumer):
+    """
+    In process message queue, a stand-in for Pub/Sub in tests and local runs.
+
+    Messages are handled ``concurrency`` at a time and the ones a handler
+    fails on are put back, up to ``max_attempts`` deliveries.
+    """
+
+    def __init__(self, concurrency: int = 1, max_attempts: int = 5) -> None:
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._queue: asyncio.Queue[typings.Delivery] = asyncio.Queue()
+
+    async def publish(self, message: typings.Message, topic: str | None = None) -> None:
+        """
+        Publish to the queue, ``topic`` is ignored.
+        """
+        await self._queue.put(
+            typings.Delivery(
+                message_id=uuid.uuid4().hex,
+                data=util.encode_message(message),
+                attempt=1,
+            )
+        )
+
+    async def publish_many(
+        self,
+        messages: collections.abc.Iterable[typings.Message],
+        topic: str | None = None,
+    ) -> None:
+        """
+        Publish several messages to the queue, ``topic`` is ignored.
+        """
+        for message in messages:
+            await self.publish(message, topic)
+
+    def warm_up(self) -> None:
+        """
+        Nothing to prepare, the queue has no clients.
+        """
+
+    async def consume(self, handler: ports.message_consumer.Handler) -> None:
+        """
+        Consume messages until cancelled.
+        """
+        async with asyncio.TaskGroup() as group:
+            for _ in range(self.concurrency):
+                group.create_task(self._work(handler))
+
+    async def join(self) -> None:
+        """
+        Wait until every message published was handled or given up on.
+        """
+        await self._queue.join()
+
+    async def _work(self, handler: ports.message_consumer.Handler) -> None:
+        while True:
+            delivery = await self._queue.get()
+            try:
+                await handler(delivery)
+            except Exception:
+                logger.exception("Failed to handle message %s.", delivery.message_id)
+                if (delivery.attempt or 1) < self.max_attempts:
+                    await self._queue.put(
+                        dataclasses.replace(
+                            delivery, attempt=(delivery.attempt or 1) + 1
+                        )
+                    )
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,66 @@
+"""
+Module containing result cache implementation.
+"""
+
+import collections
+import time
+import typing
+
+from api import ports
+
+
+class ResultCache(ports.ResultCache):
+    """
+    In process result cache, with LRU and TTL eviction.
+
+    Holds up to ``max_entries`` results for ``ttl`` seconds each.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86_400) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: collections.OrderedDict[str, tuple[float, typing.Any]] = (
+            collections.OrderedDict()
+        )
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: str) -> typing.Any:
+        """
+        Get a cached result, ``None`` when there isn't one.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            self._counters["evictions"] += 1
+            entry = None
+        if entry is None:
+            self._counters["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._counters["hits"] += 1
+        return entry[1]
+
+    def set(self, key: str, value: typing.Any) -> None:
+        """
+        Cache a result, evicting the least recently used ones when full.
+        """
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def delete(self, key: str) -> None:
+        """
+        Drop a cached result that turned out to be stale.
+        """
+        if self._entries.pop(key, None) is not None:
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> dict[str, int]:
+        """
+        Hits, misses, evictions and invalidations so far, and the entry count.
+        """
+        return {**self._counters, "entries": len(self._entries)}
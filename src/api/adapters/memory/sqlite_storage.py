@@ -0,0 +1,133 @@
+"""
+Module containing the SQLite backed memory storage implementation.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing
+import uuid
+
+from api import ports
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL
+)
+"""
+_EXPIRES_INDEX = "CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)"
+
+
+class SQLiteStorage(ports.MemoryStorage):
+    """
+    Memory Storage shared by every process of a host through a SQLite file.
+
+    Meant to live on a memory backed filesystem such as ``/dev/shm``, so any
+    gunicorn worker can answer for values set by another one. Values must be
+    JSON serializable; they expire ``ttl`` seconds after being set (unless
+    given their own ttl) and, past ``max_entries``, the ones closest to
+    expiring are evicted. Eviction runs
+    every ``prune_every`` writes to keep ``set`` cheap.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100_000,
+        ttl: float = 86_400,
+        prune_every: int = 256,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._pid = 0
+        self._writes = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection of the current process, opened on first use."""
+        # Connections can't be shared with forked processes.
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(_SCHEMA)
+            connection.execute(_EXPIRES_INDEX)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key: str | uuid.UUID) -> typing.Any:
+        """
+        Get a value from the storage, ``None`` if it's missing or expired.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires > ?",
+                (str(key), time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(
+        self, key: str | uuid.UUID, value: typing.Any, ttl: float | None = None
+    ) -> None:
+        """
+        Set a value on the storage, for ``ttl`` seconds if given.
+        """
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+                (str(key), json.dumps(value), self._expires(ttl)),
+            )
+            self._written()
+
+    def add(
+        self, key: str | uuid.UUID, value: typing.Any, ttl: float | None = None
+    ) -> bool:
+        """
+        Atomically set a value unless the key already has one.
+        """
+        with self._lock:
+            cursor = self.connection.execute(
+                "INSERT INTO entries (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "value = excluded.value, expires = excluded.expires "
+                "WHERE entries.expires <= ?",
+                (str(key), json.dumps(value), self._expires(ttl), time.time()),
+            )
+            self._written()
+        return cursor.rowcount > 0
+
+    def delete(self, key: str | uuid.UUID) -> None:
+        """
+        Remove a value from the storage.
+        """
+        with self._lock:
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (str(key),))
+
+    def _expires(self, ttl: float | None) -> float:
+        return time.time() + (self.ttl if ttl is None else ttl)
+
+    def _written(self) -> None:
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        connection = self.connection
+        connection.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+        # Keep the entries that expire last, which are mostly the ones set last.
+        connection.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM entries ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
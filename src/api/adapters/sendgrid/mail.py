@@ -1,42 +1,153 @@
 """Sendgrid implementation."""
 
+import asyncio
+import dataclasses
+import logging
 import typing
 
 import aiohttp
 
 from api import ports
 
+logger = logging.getLogger(__name__)
+
+SUBJECT = "Arquivo XES convertido"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclasses.dataclass
+class _Batch:
+    timer: asyncio.TimerHandle
+    personalizations: list[dict[str, typing.Any]] = dataclasses.field(
+        default_factory=list
+    )
+    futures: list[asyncio.Future[None]] = dataclasses.field(default_factory=list)
+
 
 class Sendgrid(ports.Notification):
-    """Implementation for sendgrid notification."""
+    """
+    Implementation for sendgrid notification.
 
-    def __init__(self, api_key: str, sender_email: str):
-        self.url = "https://api.sendgrid.com/v3/mail/send"
+    Requests share a pooled session, created on first use, and are retried
+    with exponential backoff on connection errors, 429 and 5xx responses.
+    With a ``batch_window``, notifications of the same template sent within
+    it go out in one request, as personalizations of up to ``batch_size``
+    recipients.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        sender_email: str,
+        url: str = "https://api.sendgrid.com/v3/mail/send",
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        batch_window: float = 0,
+        batch_size: int = 100,
+    ):
+        self.url = url
         self.key = api_key
         self.sender_email = sender_email
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self._session: aiohttp.ClientSession | None = None
+        self._batches: dict[str, _Batch] = {}
+        self._sending: set[asyncio.Task[None]] = set()
 
-    async def send(self, email: str, template_file: str, **kwargs: typing.Any) -> bool:
-        """Sends the notification."""
-        async with aiohttp.ClientSession() as session:
-            body = {
-                "from": {"email": self.sender_email, "name": "XES Converter Tool"},
-                "subject": "Arquivo XES convertido",
-                "personalizations": [
-                    {
-                        "to": [{"email": email}],
-                        "dynamic_template_data": kwargs,
-                        "subject": "Arquivo XES convertido",
-                    }
-                ],
-                "template_id": template_file,
-            }
-            async with session.post(
-                self.url,
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Session shared by every request, opened on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
                 headers={
                     "Authorization": f"Bearer {self.key}",
                     "Content-type": "application/json",
                 },
-                json=body,
-            ) as resp:
-                resp.raise_for_status()
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+        return self._session
+
+    async def send(self, email: str, template_file: str, **kwargs: typing.Any) -> bool:
+        """Sends the notification."""
+        personalization = {
+            "to": [{"email": email}],
+            "dynamic_template_data": kwargs,
+            "subject": SUBJECT,
+        }
+        if self.batch_window <= 0:
+            await self._post(template_file, [personalization])
+        else:
+            await self._add(template_file, personalization)
         return True
+
+    async def close(self) -> None:
+        """Sends the pending batches and closes the session."""
+        for template_file in list(self._batches):
+            self._flush(template_file)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _add(
+        self, template_file: str, personalization: dict[str, typing.Any]
+    ) -> asyncio.Future[None]:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(template_file)
+        if batch is None:
+            batch = self._batches[template_file] = _Batch(
+                timer=loop.call_later(self.batch_window, self._flush, template_file)
+            )
+        future: asyncio.Future[None] = loop.create_future()
+        batch.personalizations.append(personalization)
+        batch.futures.append(future)
+        if len(batch.personalizations) >= self.batch_size:
+            self._flush(template_file)
+        return future
+
+    def _flush(self, template_file: str) -> None:
+        batch = self._batches.pop(template_file, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.create_task(self._send_batch(template_file, batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send_batch(self, template_file: str, batch: _Batch) -> None:
+        try:
+            await self._post(template_file, batch.personalizations)
+        except Exception as exc:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_result(None)
+
+    async def _post(
+        self, template_file: str, personalizations: list[dict[str, typing.Any]]
+    ) -> None:
+        body = {
+            "from": {"email": self.sender_email, "name": "XES Converter Tool"},
+            "subject": SUBJECT,
+            "personalizations": personalizations,
+            "template_id": template_file,
+        }
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                async with self.session.post(self.url, json=body) as resp:
+                    if resp.status not in RETRY_STATUSES or last:
+                        resp.raise_for_status()
+                        return
+                    logger.warning("Sendgrid answered %s, retrying.", resp.status)
+            except (aiohttp.ClientConnectionError, TimeoutError) as exc:
+                if last:
+                    raise
+                logger.warning("Could not reach Sendgrid (%r), retrying.", exc)
+            await asyncio.sleep(self.backoff * 2**attempt)
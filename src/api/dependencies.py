@@ -1,12 +1,18 @@
 """Module containing all modules to be instantiated."""
 
+import asyncio
+import contextlib
 import logging
 import os
+import tempfile
 
 import injector
 
 from . import ports
-from .adapters import google, memory, sendgrid
+from .adapters import memory
+from .executor import ConversionExecutor
+from .scheduler import ConversionScheduler, available_memory
+from .service import ConversionService
 from .typings import Settings
 
 logger = logging.getLogger(__name__)
@@ -27,7 +33,12 @@ class SettingsModule(injector.Module):
 
 
 class GoogleModule(injector.Module):
-    """Google module."""
+    """
+    Google module.
+
+    The Google client libraries take long to import, so they are only
+    imported once an adapter is first needed.
+    """
 
     @injector.provider
     @injector.singleton
@@ -35,10 +46,18 @@ class GoogleModule(injector.Module):
         """
         Provide the Cloud Storage.
         """
+        from .adapters import google
+
         return google.CloudStorage(
             project_id=settings.get("project_id", ""),
             storage_path=settings.get("bucket_path", ""),
             creds_path=settings.get("gcp_storage_credentials", ""),
+            chunk_size=int(settings.get("storage_chunk_size", 8 * 1024 * 1024)),
+            download_chunk_size=int(
+                settings.get("download_chunk_size", 16 * 1024 * 1024)
+            ),
+            download_concurrency=int(settings.get("download_concurrency", "4")),
+            signed_url_margin=float(settings.get("signed_url_margin", "86400")),
         )
 
     @injector.provider
@@ -46,28 +65,133 @@ class GoogleModule(injector.Module):
     def provide_pubsub(self, settings: Settings) -> ports.MessagePublisher:
         """
         Provide the GCP's Pubsub.
+
+        Messages aren't held back for batching by default, as ``/convert``
+        waits for its publish: ``pubsub_batch_max_latency`` trades that
+        latency for fewer requests when publishing concurrently.
         """
+        from .adapters import google
+
         return google.MessagePublisher(
             project_id=settings.get("project_id", ""),
             creds_path=settings.get("credentials", ""),
             topic=settings.get("pubsub_topic", ""),
+            max_messages=int(settings.get("pubsub_batch_max_messages", "100")),
+            max_bytes=int(settings.get("pubsub_batch_max_bytes", "1000000")),
+            max_latency=float(settings.get("pubsub_batch_max_latency", "0")),
+        )
+
+    @injector.provider
+    @injector.singleton
+    def provide_subscriber(self, settings: Settings) -> ports.MessageConsumer:
+        """
+        Provide the GCP's Pubsub streaming pull, for the worker.
+        """
+        from .adapters import google
+
+        concurrency = int(
+            settings.get("worker_concurrency") or _conversion_workers(settings)
+        )
+        return google.MessageConsumer(
+            project_id=settings.get("project_id", ""),
+            creds_path=settings.get("credentials", ""),
+            subscription=settings.get("pubsub_subscription", "process-worker"),
+            concurrency=concurrency,
+            max_messages=int(settings.get("worker_max_messages") or concurrency),
+            max_bytes=int(settings.get("worker_max_bytes", "104857600")),
+            max_lease_duration=int(settings.get("worker_max_lease_duration", "3600")),
         )
 
 
 class UtilModule(injector.Module):
     """
     Module for util packages.
+
+    The instances that hold resources are closed by ``close``, when they
+    were created.
     """
 
     @injector.provider
     @injector.singleton
-    def provide_notification_handler(self, settings: Settings) -> ports.Notification:
+    def provide_exit_stack(self) -> contextlib.AsyncExitStack:
+        """
+        Provides the callbacks closing the instances created so far.
+        """
+        return contextlib.AsyncExitStack()
+
+    @injector.provider
+    @injector.singleton
+    def provide_notification_handler(
+        self, settings: Settings, exit_stack: contextlib.AsyncExitStack
+    ) -> ports.Notification:
         """
         Provides the sendgrid notification handler.
         """
-        return sendgrid.Sendgrid(
+        from .adapters import sendgrid
+
+        notification = sendgrid.Sendgrid(
             api_key=settings.get("sendgrid_key", ""),
             sender_email=settings.get("sender_email", ""),
+            max_retries=int(settings.get("sendgrid_max_retries", "3")),
+            batch_window=float(settings.get("sendgrid_batch_window", "0")),
+            batch_size=int(settings.get("sendgrid_batch_size", "100")),
+        )
+        exit_stack.push_async_callback(notification.close)
+        return notification
+
+    @injector.provider
+    @injector.singleton
+    def provide_conversion_executor(
+        self, settings: Settings, exit_stack: contextlib.AsyncExitStack
+    ) -> ConversionExecutor:
+        """
+        Provides the process pool conversions run in.
+        """
+        executor = ConversionExecutor(max_workers=_conversion_workers(settings))
+        exit_stack.callback(executor.shutdown)
+        return executor
+
+    @injector.provider
+    @injector.singleton
+    def provide_conversion_scheduler(self, settings: Settings) -> ConversionScheduler:
+        """
+        Provides the admission control of conversions.
+        """
+        max_running = int(
+            settings.get("max_running_conversions") or _conversion_workers(settings)
+        )
+        return ConversionScheduler(
+            max_running=max_running,
+            max_waiting=int(settings.get("max_waiting_conversions") or max_running * 2),
+            memory_budget=int(
+                settings.get("conversion_memory_budget") or available_memory() * 3 // 4
+            ),
+            memory_factor=float(settings.get("conversion_memory_factor", "15")),
+        )
+
+    @injector.provider
+    @injector.singleton
+    def provide_conversion_service(
+        self,
+        settings: Settings,
+        tasks: ports.MemoryStorage,
+        storage: ports.Storage,
+        results: ports.ResultCache,
+        notification: ports.Notification,
+        executor: ConversionExecutor,
+        scheduler: ConversionScheduler,
+    ) -> ConversionService:
+        """
+        Provides the service conversion tasks are run by.
+        """
+        return ConversionService(
+            settings=settings,
+            tasks=tasks,
+            storage=storage,
+            results=results,
+            notification=notification,
+            executor=executor,
+            scheduler=scheduler,
         )
 
 
@@ -78,11 +202,68 @@ class MemoryModule(injector.Module):
 
     @injector.provider
     @injector.singleton
-    def provide_memory_storage(self) -> ports.MemoryStorage:
+    def provide_memory_storage(self, settings: Settings) -> ports.MemoryStorage:
         """
-        Provides the sendgrid notification handler.
+        Provides the task status storage.
+
+        Shared by the workers of a host through a SQLite file unless
+        ``task_store`` is ``memory``.
         """
-        return memory.MemoryStorage()
+        max_entries = int(settings.get("task_store_size", "100000"))
+        ttl = float(settings.get("task_ttl", "86400"))
+        if settings.get("task_store", "sqlite") == "memory":
+            return memory.MemoryStorage(max_entries=max_entries, ttl=ttl)
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        return memory.SQLiteStorage(
+            path=settings.get("task_store_path")
+            or os.path.join(directory, "xes-tasks.sqlite3"),
+            max_entries=max_entries,
+            ttl=ttl,
+        )
+
+    @injector.provider
+    @injector.singleton
+    def provide_result_cache(self, settings: Settings) -> ports.ResultCache:
+        """
+        Provides the cache of conversion results.
+        """
+        return memory.ResultCache(
+            max_entries=int(settings.get("result_cache_size", "1024")),
+            ttl=float(settings.get("result_cache_ttl", "86400")),
+        )
+
+
+async def warm_up(container: injector.Injector) -> None:
+    """
+    Import and create the adapters of the app, along with their clients.
+
+    Optional, run in the background after startup when the ``warm_up``
+    setting is on so the first requests don't pay for it. Imports happen in
+    a thread to keep the event loop free. Failures are only logged, the
+    adapters are then created on first use.
+    """
+    try:
+        storage = await asyncio.to_thread(container.get, ports.Storage)
+        await asyncio.to_thread(storage.warm_up)
+        publisher = await asyncio.to_thread(container.get, ports.MessagePublisher)
+        publisher.warm_up()
+        await asyncio.to_thread(container.get, ConversionService)
+    except Exception:
+        logger.exception("Failed to warm up, adapters are created on first use.")
+
+
+async def close(container: injector.Injector) -> None:
+    """
+    Close the notification handler and the executor, if they were created.
+
+    Getting them from the container to close them would create them at
+    shutdown when they were never used, importing their dependencies.
+    """
+    await container.get(contextlib.AsyncExitStack).aclose()
+
+
+def _conversion_workers(settings: Settings) -> int:
+    return int(settings.get("conversion_workers") or os.cpu_count() or 1)
 
 
 def create_container(mods: tuple[injector.Module] | None = None) -> injector.Injector:
@@ -0,0 +1,474 @@
+"""
+Module for converting grouped event rows into XES objects.
+"""
+
+import collections
+import collections.abc
+import concurrent.futures
+import contextlib
+import dataclasses
+import functools
+import hashlib
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import typing
+
+from . import grouping, inference, ingest, timestamps, xes
+from .ingest import Row
+from .instrumentation import (
+    ConversionStats,
+    PeakMemory,
+    TimedReader,
+    TimedWriter,
+)
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_VERSION = 2
+"""Version of the XES output, to be bumped whenever the output changes."""
+
+Opener = collections.abc.Callable[
+    [], contextlib.AbstractContextManager[typing.IO[bytes]]
+]
+"""Opens a binary stream to be read or written, as a context manager."""
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class ConversionOptions:
+    """
+    Parameters of a conversion.
+
+    Kept picklable so conversions can be shipped to worker processes.
+    """
+
+    keys: dict[str, str]
+    delimiter: str = ";"
+    presorted: bool = False
+    batch_size: int = ingest.DEFAULT_BATCH_SIZE
+    grouping_memory_budget: int = 0
+    grouping_partitions: int = 64
+    grouping_spill_dir: str | None = None
+    serialization_workers: int = 1
+    serialization_shard_size: int = 1_000
+    infer_types: bool = True
+
+
+def cache_key(source: str, version: str, options: ConversionOptions) -> str:
+    """
+    Content key of the result of a conversion.
+
+    Made of the source, the ``version`` of its content (a generation, etag or
+    content hash) and the options that shape the output; options that only
+    change how the conversion runs are left out.
+    """
+    params = {
+        "source": source,
+        "version": version,
+        "keys": options.keys,
+        "delimiter": options.delimiter,
+        "infer_types": options.infer_types,
+        "output": OUTPUT_VERSION,
+    }
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def event_schema(keys: list[str], schema: dict[str, str]) -> xes.AttributeSchema:
+    """
+    Gather the keys and types of the events built out of rows with ``keys``.
+
+    Every event has all of them, so the globals hold even when there are no
+    events at all.
+    """
+    events = xes.AttributeSchema()
+    events.add("concept:name", "string")
+    events.add("time:timestamp", "date")
+    for key in keys:
+        if key not in ("concept:name", "time:timestamp"):
+            events.add(key, schema.get(key, inference.STRING))
+    return events
+
+
+def infer_schema(
+    keys: list[str],
+    sample: list[Row],
+    options: ConversionOptions,
+    stats: ConversionStats,
+) -> xes.AttributeSchema:
+    """
+    Type the event values out of a sample of rows, if enabled.
+
+    The name and timestamp are left out, their types being fixed.
+    """
+    types = {}
+    if options.infer_types:
+        with stats.stage("infer"):
+            types = inference.infer_schema(keys, sample)
+    schema = xes.AttributeSchema()
+    for key in keys:
+        if key not in ("concept:name", "time:timestamp"):
+            schema.add(key, types.get(key, inference.STRING))
+    return schema
+
+
+class TraceBuilder:
+    """
+    Builds traces out of the rows of a case.
+
+    ``keys`` names the event values of the rows, which come right after the
+    case id (see ``ingest.ColumnPlan``), and ``schema`` their types, strings
+    by default; every value must fit its type (see ``inference.widen``).
+    Traces, events and the time spent are counted into ``stats`` when given.
+    """
+
+    def __init__(
+        self,
+        keys: list[str],
+        timestamp_parser: timestamps.TimestampParser | None = None,
+        stats: ConversionStats | None = None,
+        schema: dict[str, str] | None = None,
+    ) -> None:
+        self.timestamps = timestamp_parser or timestamps.TimestampParser()
+        self.stats = stats or ConversionStats()
+        schema = schema or {}
+        self._name = keys.index("concept:name") + 1
+        self._timestamp = keys.index("time:timestamp") + 1
+        self._others = [
+            (index, key, schema.get(key, inference.STRING))
+            for index, key in enumerate(keys, start=1)
+            if index not in (self._name, self._timestamp)
+        ]
+        self._typed = any(kind != inference.STRING for _, _, kind in self._others)
+
+    def build(self, case_id: str, rows: list[Row]) -> xes.Trace:
+        """Build the trace of a case, skipping rows without timestamp."""
+        return self.build_many([(case_id, rows)])[0]
+
+    def build_many(self, groups: list[tuple[str, list[Row]]]) -> list[xes.Trace]:
+        """Build the traces of several cases, parsing their timestamps at once."""
+        timestamp = self._timestamp
+        cases = [
+            (case_id, [row for row in rows if row[timestamp]])
+            for case_id, rows in groups
+        ]
+        with self.stats.stage("timestamps"):
+            dates = self.timestamps.parse_many(
+                row[timestamp] for _, rows in cases for row in rows
+            )
+        traces = []
+        start = 0
+        for case_id, rows in cases:
+            trace = xes.Trace()
+            trace.attributes = [
+                xes.Attribute(type="string", key="concept:name", value=case_id)
+            ]
+            end = start + len(rows)
+            for row, date in zip(rows, dates[start:end], strict=True):
+                e = xes.Event()
+                e.attributes = [
+                    xes.Attribute(
+                        type="string", key="concept:name", value=row[self._name]
+                    ),
+                    xes.Attribute(type="date", key="time:timestamp", value=date),
+                    *(
+                        self._typed_attributes(row)
+                        if self._typed
+                        else [
+                            xes.Attribute(type="string", key=key, value=row[index])
+                            for index, key, _ in self._others
+                        ]
+                    ),
+                ]
+                trace.add_event(e)
+            traces.append(trace)
+            start = end
+        self.stats.traces += len(traces)
+        self.stats.events += len(dates)
+        return traces
+
+    def _typed_attributes(self, row: Row) -> list[xes.Attribute]:
+        attributes = []
+        for index, key, kind in self._others:
+            value = row[index]
+            if kind == inference.DATE:
+                value = self.timestamps.parse(value)
+            elif kind == inference.BOOLEAN:
+                value = value.lower()
+            attributes.append(xes.Attribute(type=kind, key=key, value=value))
+        return attributes
+
+    def build_all(
+        self,
+        groups: collections.abc.Iterable[tuple[str, list[Row]]],
+        chunk_size: int = 64,
+    ) -> collections.abc.Iterator[xes.Trace]:
+        """
+        Lazily build a trace for every ``(case_id, rows)`` group.
+
+        Groups are pulled and built ``chunk_size`` at a time, the time spent
+        pulling them counting as ``group``.
+        """
+        iterator = iter(groups)
+        group, build = self.stats.stage("group"), self.stats.stage("build")
+        while True:
+            with group:
+                chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                return
+            with build:
+                traces = self.build_many(chunk)
+            yield from traces
+
+
+def new_log() -> xes.XES:
+    """Create the log every conversion is written into."""
+    log = xes.XES()
+    log.use_default_extensions = True
+    log.classifiers = [
+        xes.Classifier(name="Event Name", keys="concept:name"),
+    ]
+    log.add_global_trace_attributes(
+        xes.Attribute(type="string", key="concept:name", value="")
+    )
+    return log
+
+
+def write_log(
+    log: xes.XES,
+    keys: list[str],
+    schema: dict[str, str],
+    groups: collections.abc.Iterable[tuple[str, list[Row]]],
+    sink: typing.IO[bytes],
+    options: ConversionOptions,
+    stats: ConversionStats | None = None,
+) -> None:
+    """
+    Build and write the traces of ``groups`` into ``sink``.
+
+    The event globals of ``log`` are declared out of ``event_schema`` as the
+    header is written, since it comes before any event: ``schema`` must fit
+    every value of the groups.
+
+    With more than one serialization worker the groups are split into shards
+    of ``serialization_shard_size`` cases, each shard is built and serialized
+    in a worker process and the fragments are written back in order, which
+    gives the same bytes as the sequential path. The time spent waiting on
+    the workers then counts as serialization.
+    """
+    stats = stats or ConversionStats()
+    event_schema(keys, schema).apply(log)
+    if options.serialization_workers <= 1:
+        with stats.stage("serialize"):
+            log.write_to(
+                sink, TraceBuilder(keys, stats=stats, schema=schema).build_all(groups)
+            )
+        return
+
+    def collect(shard: concurrent.futures.Future[tuple[bytes, int]]) -> None:
+        with stats.stage("serialize"):
+            data, events = shard.result()
+        stats.events += events
+        sink.write(data)
+
+    sink.write(log.header().encode("utf-8"))
+    iterator = iter(groups)
+    group = stats.stage("group")
+    pending: collections.deque[concurrent.futures.Future[tuple[bytes, int]]] = (
+        collections.deque()
+    )
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=options.serialization_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        while True:
+            with group:
+                shard = list(
+                    itertools.islice(iterator, options.serialization_shard_size)
+                )
+            if not shard:
+                break
+            pending.append(pool.submit(render_shard, keys, schema, shard))
+            stats.traces += len(shard)
+            # Bound the shards in flight so memory doesn't grow with the log.
+            if len(pending) > options.serialization_workers * 2:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+    sink.write(log.footer().encode("utf-8"))
+
+
+def render_shard(
+    keys: list[str], schema: dict[str, str], groups: list[tuple[str, list[Row]]]
+) -> tuple[bytes, int]:
+    """
+    Build and serialize the traces of a shard of groups.
+
+    :returns: the serialized traces and their number of events.
+    """
+    builder = TraceBuilder(keys, schema=schema)
+    data = "".join(
+        xes.XES.serialize_trace(trace) for trace in builder.build_many(groups)
+    ).encode("utf-8")
+    return data, builder.stats.events
+
+
+def convert_grouped(
+    source: typing.TextIO,
+    sink: typing.IO[bytes],
+    options: ConversionOptions,
+    stats: ConversionStats | None = None,
+) -> None:
+    """
+    Convert any CSV input, grouping all of its rows by case first.
+
+    The types inferred out of the first batch are widened to fit every row
+    while grouping, so the header is written with the types of the events.
+    """
+    stats = stats or ConversionStats()
+    log = new_log()
+    parser = timestamps.TimestampParser()
+    with grouping.CaseGrouper(
+        memory_budget=options.grouping_memory_budget,
+        partitions=options.grouping_partitions,
+        directory=options.grouping_spill_dir,
+    ) as grouper:
+        with stats.stage("parse"):
+            reader = ingest.CSVReader(source, options.keys, options.delimiter)
+        batches = stats.timed("parse", reader.batches(options.batch_size))
+        first = next(batches, [])
+        schema = infer_schema(reader.keys, first, options, stats)
+        infer = stats.stage("infer")
+        for batch in itertools.chain([first], batches):
+            with infer:
+                inference.widen(schema, reader.keys, batch, parser)
+            with stats.stage("group"):
+                for row in batch:
+                    grouper.add(row[0], row)
+            stats.rows += len(batch)
+        write_log(
+            log, reader.keys, schema.types, grouper.groups(), sink, options, stats
+        )
+
+
+def convert_presorted(
+    source: typing.TextIO,
+    sink: typing.IO[bytes],
+    options: ConversionOptions,
+    stats: ConversionStats | None = None,
+) -> None:
+    """
+    Convert a CSV input sorted by case, writing each trace once its case ends.
+
+    The header is written before the rows are read, with the types inferred
+    out of the first batch.
+
+    :raises grouping.UnsortedInputError: if a case shows up twice.
+    :raises inference.TypeMismatchError: if values don't fit those types.
+    """
+    stats = stats or ConversionStats()
+    log = new_log()
+    parser = timestamps.TimestampParser()
+    with stats.stage("parse"):
+        reader = ingest.CSVReader(source, options.keys, options.delimiter)
+    batches = stats.timed("parse", reader.batches(options.batch_size))
+    first = next(batches, [])
+    schema = infer_schema(reader.keys, first, options, stats)
+    declared = dict(schema.types)
+
+    def groups() -> collections.abc.Iterator[tuple[str, list[Row]]]:
+        grouper = grouping.SortedGrouper()
+        infer = stats.stage("infer")
+        for batch in itertools.chain([first], batches):
+            with infer:
+                if widened := inference.widen(schema, reader.keys, batch, parser):
+                    raise inference.TypeMismatchError(widened)
+            stats.rows += len(batch)
+            for row in batch:
+                if finished := grouper.add(row[0], row):
+                    yield finished
+        if finished := grouper.finish():
+            yield finished
+
+    write_log(log, reader.keys, declared, groups(), sink, options, stats)
+
+
+def convert(
+    open_source: Opener, open_target: Opener, options: ConversionOptions
+) -> ConversionStats:
+    """
+    Convert the CSV stream of ``open_source`` into an XES stream.
+
+    Both streams are opened here, so the input is read and the output written
+    chunk by chunk without ever being held whole. Presorted inputs that turn
+    out not to be sorted, or to have values that don't fit the types of the
+    header written already, are converted again by grouping their rows, which
+    types them all before writing, reopening both streams; the target opener
+    must discard what was written when its context exits with an error.
+
+    :returns: the time spent per stage, the counts and the peak memory.
+    """
+    stats = ConversionStats()
+    memory = PeakMemory()
+    try:
+        with memory:
+            if options.presorted:
+                try:
+                    _convert_streams(
+                        convert_presorted, open_source, open_target, options, stats
+                    )
+                    return stats
+                except inference.TypeMismatchError as exc:
+                    logger.warning("%s Regrouping the input.", exc)
+                    stats = ConversionStats(stages=stats.stages)
+                except grouping.UnsortedInputError as exc:
+                    logger.warning("Input is not sorted (%s), regrouping it.", exc)
+                    stats = ConversionStats(stages=stats.stages)
+            _convert_streams(convert_grouped, open_source, open_target, options, stats)
+            return stats
+    finally:
+        stats.peak_memory = memory.peak
+
+
+def _convert_streams(
+    func: collections.abc.Callable[
+        [typing.TextIO, typing.IO[bytes], ConversionOptions, ConversionStats], None
+    ],
+    open_source: Opener,
+    open_target: Opener,
+    options: ConversionOptions,
+    stats: ConversionStats,
+) -> None:
+    with contextlib.ExitStack() as stack:
+        with stats.stage("upload"):
+            sink = stack.enter_context(open_target())
+        with stats.stage("download"):
+            raw = stack.enter_context(open_source())
+        source = io.TextIOWrapper(
+            io.BufferedReader(TimedReader(raw, stats), buffer_size=_BUFFER_SIZE),
+            encoding="utf-8",
+            newline="",
+        )
+        target = io.BufferedWriter(TimedWriter(sink, stats), buffer_size=_BUFFER_SIZE)
+        func(source, target, options, stats)
+        target.flush()
+        # Closing the target is what commits the upload.
+        with stats.stage("upload"):
+            stack.close()
+
+
+_BUFFER_SIZE = 1024 * 1024
+
+
+def convert_file(
+    source_path: str, target_path: str, options: ConversionOptions
+) -> ConversionStats:
+    """Convert the CSV file at ``source_path`` into an XES file at ``target_path``."""
+    return convert(
+        typing.cast(Opener, functools.partial(open, source_path, "rb")),
+        typing.cast(Opener, functools.partial(open, target_path, "wb")),
+        options,
+    )
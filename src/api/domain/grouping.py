@@ -0,0 +1,184 @@
+"""
+Module for grouping rows by case.
+"""
+
+import collections.abc
+import pickle
+import tempfile
+import types
+import typing
+import zlib
+
+from .ingest import Row
+
+# Rough overheads of a row kept in memory: the tuple itself and, per value, a
+# slot plus the header of the string. Used instead of ``sys.getsizeof`` to
+# keep ``add`` cheap.
+_ROW_OVERHEAD = 40
+_VALUE_OVERHEAD = 8 + 49
+
+
+def estimate_size(row: Row) -> int:
+    """Estimate, in bytes, how much memory a row takes."""
+    size = _ROW_OVERHEAD
+    for value in row:
+        size += _VALUE_OVERHEAD + len(value)
+    return size
+
+
+class CaseGrouper:
+    """
+    Groups rows by their case id.
+
+    Rows are kept in memory until ``memory_budget`` bytes (estimated) are
+    exceeded; from then on the groups are spilled to hash partitioned files on
+    disk and, once reading is done, rebuilt one partition at a time. A budget
+    of ``0`` never spills.
+
+    Traces come out in insertion order while everything fits in memory and in
+    partition order otherwise.
+    """
+
+    def __init__(
+        self,
+        memory_budget: int = 0,
+        partitions: int = 64,
+        directory: str | None = None,
+    ) -> None:
+        self.memory_budget = memory_budget
+        self.partitions = partitions
+        self.directory = directory
+        self.spilled = False
+        self._groups: dict[str, list[Row]] = {}
+        self._size = 0
+        self._files: list[typing.BinaryIO] = []
+
+    def add(self, case_id: str, row: Row) -> None:
+        """Add a row to the group of its case."""
+        group = self._groups.get(case_id)
+        if group is None:
+            group = self._groups[case_id] = []
+        group.append(row)
+        if not self.memory_budget:
+            return
+        self._size += estimate_size(row)
+        if self._size > self.memory_budget:
+            self._spill()
+
+    def groups(self) -> collections.abc.Iterator[tuple[str, list[Row]]]:
+        """
+        Yield every case id with its rows.
+
+        Groups are released as they are yielded, so this can only be consumed
+        once.
+        """
+        if not self.spilled:
+            for case_id in list(self._groups):
+                yield case_id, self._groups.pop(case_id)
+            return
+
+        self._spill()
+        try:
+            for file in self._files:
+                file.flush()
+                file.seek(0)
+                groups: dict[str, list[Row]] = {}
+                while True:
+                    try:
+                        case_id, rows = pickle.load(file)
+                    except EOFError:
+                        break
+                    if case_id in groups:
+                        groups[case_id].extend(rows)
+                    else:
+                        groups[case_id] = rows
+                file.close()
+                for case_id in list(groups):
+                    yield case_id, groups.pop(case_id)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Release the memory and the spill files."""
+        self._groups.clear()
+        self._size = 0
+        for file in self._files:
+            file.close()
+        self._files = []
+
+    def _spill(self) -> None:
+        if not self._files:
+            self._files = [
+                typing.cast(
+                    typing.BinaryIO,
+                    tempfile.TemporaryFile(prefix="xes-group-", dir=self.directory),
+                )
+                for _ in range(self.partitions)
+            ]
+            self.spilled = True
+        for case_id, rows in self._groups.items():
+            partition = zlib.crc32(case_id.encode("utf-8")) % self.partitions
+            pickle.dump((case_id, rows), self._files[partition])
+        self._groups.clear()
+        self._size = 0
+
+    def __enter__(self) -> "CaseGrouper":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class UnsortedInputError(Exception):
+    """Raised when input expected to be sorted by case id is not."""
+
+    def __init__(self, case_id: str) -> None:
+        super().__init__(f"Case {case_id!r} appears again after other cases.")
+        self.case_id = case_id
+
+
+class SortedGrouper:
+    """
+    Groups rows of an input that is already sorted by case id.
+
+    Only the rows of the current case are held: a group is handed back as
+    soon as the case id changes. Seeing a case id again after another case
+    raises ``UnsortedInputError``.
+    """
+
+    def __init__(self) -> None:
+        self._case_id: str | None = None
+        self._rows: list[Row] = []
+        self._seen: set[str] = set()
+
+    def add(self, case_id: str, row: Row) -> tuple[str, list[Row]] | None:
+        """
+        Add a row of ``case_id``.
+
+        :returns: the previous case and its rows when ``case_id`` starts a
+            new case, otherwise ``None``.
+        """
+        if case_id == self._case_id:
+            self._rows.append(row)
+            return None
+        if case_id in self._seen:
+            raise UnsortedInputError(case_id)
+        self._seen.add(case_id)
+        finished = self.finish()
+        self._case_id = case_id
+        self._rows = [row]
+        return finished
+
+    def finish(self) -> tuple[str, list[Row]] | None:
+        """Hand back the case being grouped, if any."""
+        if self._case_id is None:
+            return None
+        finished = (self._case_id, self._rows)
+        self._case_id = None
+        self._rows = []
+        return finished
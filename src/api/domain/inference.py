@@ -0,0 +1,136 @@
+"""
+Module for inferring the XES types of CSV columns.
+"""
+
+import collections.abc
+import re
+
+from . import timestamps, xes
+from .ingest import Row
+
+INT = "int"
+FLOAT = "float"
+BOOLEAN = "boolean"
+DATE = "date"
+STRING = "string"
+
+# Numbers with leading zeros are codes rather than quantities, and numbers
+# are capped to the 18 digits that fit in the 64 bits of an XES int, longer
+# ones being identifiers. Every pattern matches a value in a single way, so a
+# value that doesn't fit fails without backtracking.
+_PATTERNS = {
+    BOOLEAN: r"(?i:true|false)",
+    INT: r"[+-]?(?:0|[1-9]\d{0,17})",
+    FLOAT: r"[+-]?(?:(?:0|[1-9]\d{0,17})(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?",
+    # The shapes timestamps.CANDIDATES parse, ISO 8601 first.
+    DATE: (
+        r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?"
+        r"(?:Z|[+-]\d{2}:?\d{2})?)?"
+        r"|\d{1,2}/\d{1,2}/\d{4}(?: \d{1,2}:\d{2}(?::\d{2})?)?"
+        r"|\d{4}/\d{1,2}/\d{1,2}(?: \d{1,2}:\d{2}(?::\d{2})?)?"
+    ),
+}
+
+CELL = {kind: re.compile(pattern) for kind, pattern in _PATTERNS.items()}
+"""Patterns a single value of each type matches in full."""
+
+
+class TypeMismatchError(Exception):
+    """Raised when values don't fit the types their columns were written as."""
+
+    def __init__(self, keys: list[str]) -> None:
+        super().__init__(f"Values of {', '.join(keys)} don't fit their type.")
+        self.keys = keys
+
+
+def infer_type(
+    values: collections.abc.Iterable[str],
+    timestamp_parser: timestamps.TimestampParser | None = None,
+) -> str:
+    """
+    Infer the XES type of a column out of a sample of its values.
+
+    A column with empty values is a string, since typed attributes can't be
+    empty. Each distinct value is checked once, and dates must also be
+    understood by the timestamp parser.
+    """
+    present = set(values)
+    if not present or "" in present:
+        return STRING
+    for kind in (BOOLEAN, INT, FLOAT, DATE):
+        fullmatch = CELL[kind].fullmatch
+        if all(fullmatch(value) for value in present):
+            break
+    else:
+        return STRING
+    if kind == DATE:
+        parser = timestamp_parser or timestamps.TimestampParser()
+        try:
+            parser.parse_many(present)
+        except (ValueError, OverflowError):
+            return STRING
+    return kind
+
+
+def fits(kind: str, value: str, timestamp_parser: timestamps.TimestampParser) -> bool:
+    """Whether ``value`` can be written as an attribute of type ``kind``."""
+    if kind == STRING:
+        return True
+    if not CELL[kind].fullmatch(value):
+        return False
+    if kind == DATE:
+        try:
+            timestamp_parser.parse(value)
+        except (ValueError, OverflowError):
+            return False
+    return True
+
+
+def widen(
+    schema: xes.AttributeSchema,
+    keys: list[str],
+    rows: list[Row],
+    timestamp_parser: timestamps.TimestampParser,
+) -> list[str]:
+    """
+    Widen the types of ``schema`` until every value of ``rows`` fits them.
+
+    Only the keys in ``schema`` are checked, each distinct value once.
+
+    :returns: the keys whose type was widened.
+    """
+    widened = []
+    for index, key in enumerate(keys, start=1):
+        declared = kind = schema.types.get(key, STRING)
+        if kind == STRING:
+            continue
+        for value in {row[index] for row in rows}:
+            if not fits(kind, value, timestamp_parser):
+                schema.add(key, infer_type([value], timestamp_parser))
+                kind = schema.types[key]
+                if kind == STRING:
+                    break
+        if kind != declared:
+            widened.append(key)
+    return widened
+
+
+def infer_schema(
+    keys: list[str],
+    sample: list[Row],
+    timestamp_parser: timestamps.TimestampParser | None = None,
+) -> dict[str, str]:
+    """
+    Infer the type of every event value of the rows out of a sample of them.
+
+    ``keys`` names the event values, which come right after the case id (see
+    ``ingest.ColumnPlan``). The sample is split into columns at once and each
+    column is typed on its own.
+    """
+    columns = list(zip(*sample, strict=True))[1:] if sample else []
+    if not columns:
+        return {key: STRING for key in keys}
+    return {
+        key: infer_type(column, timestamp_parser)
+        for key, column in zip(keys, columns, strict=True)
+    }
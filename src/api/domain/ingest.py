@@ -0,0 +1,85 @@
+"""
+Module for reading event rows out of CSV files in bulk.
+"""
+
+import collections.abc
+import csv
+import itertools
+import operator
+import typing
+
+Row = tuple[str, ...]
+"""A parsed row: the case id followed by the event values."""
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+class ColumnPlan:
+    """
+    Precompiled mapping of CSV columns into event keys.
+
+    Built once from the header: the case column and every event column are
+    resolved to indexes, so a row is rearranged by a single ``itemgetter``
+    call instead of dict lookups and pops.
+    ``keys`` names the event values of a row, mapped keys first and then the
+    unmapped columns under their header name.
+    """
+
+    def __init__(self, header: list[str], keys: dict[str, str]) -> None:
+        mapping = dict(keys)
+        positions = {column: index for index, column in enumerate(header)}
+        case_column = mapping.pop("concept:id")
+        used = {case_column, *mapping.values()}
+        missing = [column for column in used if column not in positions]
+        if missing:
+            raise KeyError(", ".join(missing))
+
+        self.width = len(header)
+        self.keys = [
+            *mapping,
+            *(column for column in header if column not in used),
+        ]
+        self._getter = operator.itemgetter(
+            positions[case_column],
+            *(positions[column] for column in mapping.values()),
+            *(index for index, column in enumerate(header) if column not in used),
+        )
+
+    def rows(self, chunk: list[list[str]]) -> list[Row]:
+        """Rearrange parsed CSV rows, skipping blank lines."""
+        getter = self._getter
+        try:
+            return [getter(row) for row in chunk if row]
+        except IndexError:
+            padding = [""] * self.width
+            return [getter(row + padding) for row in chunk if row]
+
+
+class CSVReader:
+    """
+    Reads a CSV file (opened with ``newline=""``) in batches of rows.
+
+    An empty file has no rows, and its ``keys`` are the mapped ones so it
+    still converts into an empty log.
+    """
+
+    def __init__(
+        self, file: typing.TextIO, keys: dict[str, str], delimiter: str
+    ) -> None:
+        self._reader = csv.reader(file, delimiter=delimiter)
+        header = next(self._reader, None)
+        self._plan = ColumnPlan(header, keys) if header is not None else None
+        self.keys = (
+            self._plan.keys if self._plan else [k for k in keys if k != "concept:id"]
+        )
+
+    def batches(
+        self, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> collections.abc.Iterator[list[Row]]:
+        """Yield lists of up to ``batch_size`` rows."""
+        if self._plan is None:
+            return
+        rows = self._plan.rows
+        while chunk := list(itertools.islice(self._reader, batch_size)):
+            if batch := rows(chunk):
+                yield batch
@@ -0,0 +1,184 @@
+"""
+Module for measuring where the time and memory of a conversion go.
+"""
+
+import collections.abc
+import dataclasses
+import io
+import resource
+import sys
+import time
+import types
+import typing
+
+T = typing.TypeVar("T")
+
+
+@dataclasses.dataclass(kw_only=True)
+class ConversionStats:
+    """
+    Measurements of a conversion.
+
+    ``stages`` holds the seconds spent in each stage, exclusive of the stages
+    nested in it: waiting on the input counts as ``download`` even while
+    parsing, building traces pulls timestamps out as ``timestamps``, and so
+    on. Stages are timed per batch of rows, chunk of traces or buffer of
+    bytes, never per row, to keep the measuring out of the measurements.
+    """
+
+    stages: dict[str, float] = dataclasses.field(default_factory=dict)
+    rows: int = 0
+    traces: int = 0
+    events: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    peak_memory: int = 0
+    cached: bool = False
+    _stack: list[str] = dataclasses.field(default_factory=list, repr=False)
+    _since: float = dataclasses.field(default=0.0, repr=False)
+    _timers: dict[str, "Stage"] = dataclasses.field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    def stage(self, name: str) -> "Stage":
+        """Count the time spent inside the ``with`` block as ``name``."""
+        if (stage := self._timers.get(name)) is None:
+            stage = self._timers[name] = Stage(self, name)
+        return stage
+
+    def timed(
+        self, name: str, iterable: collections.abc.Iterable[T]
+    ) -> collections.abc.Iterator[T]:
+        """Iterate, counting the time spent producing each item as ``name``."""
+        iterator = iter(iterable)
+        stage = self.stage(name)
+        while True:
+            with stage:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def as_dict(self) -> dict[str, typing.Any]:
+        """The measurements, with stages in seconds rounded to milliseconds."""
+        return {
+            "stages": {name: round(value, 3) for name, value in self.stages.items()},
+            "rows": self.rows,
+            "traces": self.traces,
+            "events": self.events,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_memory": self.peak_memory,
+            "cached": self.cached,
+        }
+
+
+class Stage:
+    """Reusable context manager timing a stage of a ``ConversionStats``."""
+
+    __slots__ = ("name", "stats")
+
+    def __init__(self, stats: ConversionStats, name: str) -> None:
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self) -> None:
+        stats = self.stats
+        now = time.perf_counter()
+        if stats._stack:
+            parent = stats._stack[-1]
+            stats.stages[parent] = stats.stages.get(parent, 0.0) + now - stats._since
+        stats._stack.append(self.name)
+        stats._since = now
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        stats = self.stats
+        now = time.perf_counter()
+        current = stats._stack.pop()
+        stats.stages[current] = stats.stages.get(current, 0.0) + now - stats._since
+        stats._since = now
+
+
+class TimedReader(io.RawIOBase):
+    """Binary reader counting the bytes read and the time waited on them."""
+
+    def __init__(self, raw: typing.IO[bytes], stats: ConversionStats) -> None:
+        super().__init__()
+        self.raw = raw
+        self.stats = stats
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: typing.Any) -> int:
+        with self.stats.stage("download"):
+            size: int = self.raw.readinto(buffer)  # type: ignore[attr-defined]
+        self.stats.bytes_in += size
+        return size
+
+
+class TimedWriter(io.RawIOBase):
+    """Binary writer counting the bytes written and the time spent on them."""
+
+    def __init__(self, raw: typing.IO[bytes], stats: ConversionStats) -> None:
+        super().__init__()
+        self.raw = raw
+        self.stats = stats
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: typing.Any) -> int:
+        with self.stats.stage("upload"):
+            self.raw.write(data)
+        size = len(data)
+        self.stats.bytes_out += size
+        return size
+
+
+class PeakMemory:
+    """
+    Measures the peak resident memory of the process over a block.
+
+    On Linux the kernel's high water mark is reset when entering and read back
+    when leaving, which costs nothing in between. Elsewhere, or when it can't
+    be reset, ``peak`` is the peak over the whole life of the process.
+    """
+
+    def __init__(self) -> None:
+        self.peak = 0
+
+    def __enter__(self) -> "PeakMemory":
+        try:
+            with open("/proc/self/clear_refs", "w", encoding="utf-8") as file:
+                file.write("5")
+        except OSError:
+            pass
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: types.TracebackType | None,
+    ) -> None:
+        self.peak = _high_water_mark()
+
+
+def _high_water_mark() -> int:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,101 @@
+"""
+Module for parsing event timestamps.
+"""
+
+import collections.abc
+import datetime
+
+from dateutil import parser
+
+Parse = collections.abc.Callable[[str], datetime.datetime]
+
+
+def strptime(fmt: str) -> Parse:
+    """Build a parser for a fixed ``strptime`` format."""
+
+    def parse(value: str) -> datetime.datetime:
+        return datetime.datetime.strptime(value, fmt)
+
+    return parse
+
+
+# Strict parsers tried before falling back to dateutil. They either agree with
+# dateutil or raise, as long as they don't interpret ambiguous dates
+# differently: day-first formats are left out on purpose since dateutil reads
+# "01/02/2020" as January 2nd (but "13/02/2020" as February 13th).
+CANDIDATES: tuple[Parse, ...] = (
+    datetime.datetime.fromisoformat,
+    *(
+        strptime(fmt)
+        for fmt in (
+            "%m/%d/%Y %H:%M:%S",
+            "%m/%d/%Y %H:%M",
+            "%m/%d/%Y",
+            "%Y/%m/%d %H:%M:%S",
+            "%Y/%m/%d %H:%M",
+            "%Y/%m/%d",
+        )
+    ),
+)
+
+_SHAPE = str.maketrans("123456789", "000000000")
+
+
+def _fallback(value: str) -> datetime.datetime:
+    return parser.parse(value)
+
+
+class TimestampParser:
+    """
+    Parses timestamps into the XES date format, in UTC with milliseconds.
+
+    The first time a value of a given shape (the value with its digits
+    blanked out) is seen, the candidate formats are checked against dateutil
+    and the first one that agrees is used for every other value of that shape.
+    Values the format can't handle, or shapes no candidate agrees with, are
+    parsed by dateutil. Results are memoized since timestamps repeat a lot.
+    """
+
+    def __init__(self, cache_size: int = 65_536, max_shapes: int = 1_024) -> None:
+        self.cache_size = cache_size
+        self.max_shapes = max_shapes
+        self._formats: dict[str, Parse] = {}
+        self._cache: dict[str, str] = {}
+
+    def parse(self, value: str) -> str:
+        """Parse a single timestamp."""
+        if (result := self._cache.get(value)) is not None:
+            return result
+        shape = value.translate(_SHAPE)
+        if (fmt := self._formats.get(shape)) is None:
+            date = self._learn(shape, value)
+        else:
+            try:
+                date = fmt(value)
+            except ValueError:
+                date = parser.parse(value)
+        result = date.replace(tzinfo=datetime.UTC).isoformat(timespec="milliseconds")
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[value] = result
+        return result
+
+    def parse_many(self, values: collections.abc.Iterable[str]) -> list[str]:
+        """Parse a batch of timestamps."""
+        parse = self.parse
+        return [parse(value) for value in values]
+
+    def _learn(self, shape: str, value: str) -> datetime.datetime:
+        expected = parser.parse(value)
+        fmt: Parse = _fallback
+        for candidate in CANDIDATES:
+            try:
+                date = candidate(value)
+            except ValueError:
+                continue
+            if date.replace(tzinfo=None) == expected.replace(tzinfo=None):
+                fmt = candidate
+                break
+        if len(self._formats) < self.max_shapes:
+            self._formats[shape] = fmt
+        return expected
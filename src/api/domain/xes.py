@@ -1,5 +1,44 @@
+import collections.abc
+import re
+import sys
+import typing
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
+
+_ATTRIBUTE_ESCAPES = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "\n": "&#10;",
+        "\r": "&#13;",
+        "\t": "&#09;",
+    }
+)
+_NEEDS_ESCAPE = re.compile('[&<>"\n\r\t]')
+
+EPOCH = "1970-01-01T00:00:00.000+00:00"
+
+DEFAULTS = {"string": "", "int": "0", "float": "0.0", "boolean": "false", "date": EPOCH}
+"""Value of the globals of each attribute type."""
+
+
+def escape(value: str) -> str:
+    """Escape a value to be used inside a double quoted XML attribute."""
+    if _NEEDS_ESCAPE.search(value) is None:
+        return value
+    return value.translate(_ATTRIBUTE_ESCAPES)
+
+
+class _Renderable(typing.Protocol):
+    def render(self, out: list[str], depth: int, indent: str, newline: str) -> None:
+        """Append the serialized object to ``out``."""
+
+
+def _to_string(obj: _Renderable) -> str:
+    out: list[str] = []
+    obj.render(out, 0, "  ", "\n")
+    return "".join(out)
 
 
 class Attribute:
@@ -8,29 +47,55 @@ class Attribute:
 
     Set the type, key, and value of the attribute and
     add this attribute to a trace or the log.
+
+    Types and keys are interned since they repeat on every event, and no XML
+    element is kept around: it is only built by ``xml`` when asked for.
     """
 
+    __slots__ = ("type", "key", "value", "children")
+
     def __init__(
         self,
         type: str = "not set",
         key: str = "not set",
         value: str = "not set",
     ) -> None:
-        self.type = type
-        self.key = key
+        self.type = sys.intern(type)
+        self.key = sys.intern(key)
         self.value = value
-
-        self.xml = ET.Element(self.type)
-        self.xml.set("key", key)
-        if self.type.lower() not in ("list", "container"):
-            self.xml.set("value", value)
+        self.children: list[Attribute] | None = None
 
     def nest_attribute(self, attribute: "Attribute") -> None:
-        self.xml.append(attribute.xml)
+        if self.children is None:
+            self.children = []
+        self.children.append(attribute)
+
+    @property
+    def xml(self) -> ET.Element:
+        element = ET.Element(self.type)
+        element.set("key", self.key)
+        if self.type.lower() not in ("list", "container"):
+            element.set("value", self.value)
+        for child in self.children or ():
+            element.append(child.xml)
+        return element
+
+    def render(self, out: list[str], depth: int, indent: str, newline: str) -> None:
+        """Append the serialized attribute (and its children) to ``out``."""
+        padding = indent * depth
+        tag = f'{padding}<{self.type} key="{escape(self.key)}"'
+        if self.type.lower() not in ("list", "container"):
+            tag = f'{tag} value="{escape(self.value)}"'
+        if not self.children:
+            out.append(f"{tag}/>{newline}")
+            return
+        out.append(f"{tag}>{newline}")
+        for child in self.children:
+            child.render(out, depth + 1, indent, newline)
+        out.append(f"{padding}</{self.type}>{newline}")
 
     def __str__(self) -> str:
-        result: str = ET.dump(self.xml)  # type: ignore[func-returns-value]
-        return result
+        return _to_string(self)
 
 
 class Extension:
@@ -39,6 +104,8 @@ class Extension:
     Used for the Log.
     """
 
+    __slots__ = ("name", "prefix", "uri")
+
     def __init__(
         self,
         name: str = "not set",
@@ -49,14 +116,23 @@ class Extension:
         self.prefix = prefix
         self.uri = uri
 
-        self.xml = ET.Element("extension")
-        self.xml.set("name", name)
-        self.xml.set("prefix", prefix)
-        self.xml.set("uri", uri)
+    @property
+    def xml(self) -> ET.Element:
+        element = ET.Element("extension")
+        element.set("name", self.name)
+        element.set("prefix", self.prefix)
+        element.set("uri", self.uri)
+        return element
+
+    def render(self, out: list[str], depth: int, indent: str, newline: str) -> None:
+        """Append the serialized extension to ``out``."""
+        out.append(
+            f'{indent * depth}<extension name="{escape(self.name)}" '
+            f'prefix="{escape(self.prefix)}" uri="{escape(self.uri)}"/>{newline}'
+        )
 
     def __str__(self) -> str:
-        result: str = ET.dump(self.xml)  # type: ignore[func-returns-value]
-        return result
+        return _to_string(self)
 
 
 class Classifier:
@@ -65,6 +141,8 @@ class Classifier:
     Used by the Log. Should be the main attributes of events you want to classify by.
     """
 
+    __slots__ = ("name", "keys")
+
     def __init__(
         self,
         name: str = "not set",
@@ -73,33 +151,55 @@ class Classifier:
         self.name = name
         self.keys = keys
 
-        self.xml = ET.Element("classifier")
-        self.xml.set("name", name)
-        self.xml.set("keys", keys)
+    @property
+    def xml(self) -> ET.Element:
+        element = ET.Element("classifier")
+        element.set("name", self.name)
+        element.set("keys", self.keys)
+        return element
+
+    def render(self, out: list[str], depth: int, indent: str, newline: str) -> None:
+        """Append the serialized classifier to ``out``."""
+        out.append(
+            f'{indent * depth}<classifier name="{escape(self.name)}" '
+            f'keys="{escape(self.keys)}"/>{newline}'
+        )
 
     def __str__(self) -> str:
-        result: str = ET.dump(self.xml)  # type: ignore[func-returns-value]
-        return result
+        return _to_string(self)
 
 
 class Event:
     """An event class. Add attributes to an event."""
 
+    __slots__ = ("attributes",)
+
     def __init__(self) -> None:
-        self.xml = ET.Element("event")
         self.attributes: list[Attribute] = []
 
     def add_attribute(self, attr: Attribute) -> "Event":
         self.attributes.append(attr)
         return self
 
-    def build_event(self) -> None:
+    @property
+    def xml(self) -> ET.Element:
+        element = ET.Element("event")
+        element.extend(attribute.xml for attribute in self.attributes)
+        return element
+
+    def render(self, out: list[str], depth: int, indent: str, newline: str) -> None:
+        """Append the serialized event to ``out``."""
+        padding = indent * depth
+        if not self.attributes:
+            out.append(f"{padding}<event/>{newline}")
+            return
+        out.append(f"{padding}<event>{newline}")
         for attribute in self.attributes:
-            self.xml.append(attribute.xml)
+            attribute.render(out, depth + 1, indent, newline)
+        out.append(f"{padding}</event>{newline}")
 
     def __str__(self) -> str:
-        result: str = ET.dump(self.xml)  # type: ignore[func-returns-value]
-        return result
+        return _to_string(self)
 
 
 class Trace:
@@ -107,8 +207,9 @@ class Trace:
     An aggregator of events.
     """
 
+    __slots__ = ("events", "attributes")
+
     def __init__(self) -> None:
-        self.xml = ET.Element("trace")
         self.events: list[Event] = []
         self.attributes: list[Attribute] = []
 
@@ -118,25 +219,69 @@ class Trace:
     def add_event(self, event: Event) -> None:
         self.events.append(event)
 
-    def build_trace(self) -> None:
+    @property
+    def xml(self) -> ET.Element:
+        element = ET.Element("trace")
+        element.extend(attribute.xml for attribute in self.attributes)
+        element.extend(event.xml for event in self.events)
+        return element
+
+    def render(self, out: list[str], depth: int, indent: str, newline: str) -> None:
+        """Append the serialized trace to ``out``."""
+        padding = indent * depth
+        if not self.attributes and not self.events:
+            out.append(f"{padding}<trace/>{newline}")
+            return
+        out.append(f"{padding}<trace>{newline}")
         for attribute in self.attributes:
-            self.xml.append(attribute.xml)
+            attribute.render(out, depth + 1, indent, newline)
         for event in self.events:
-            self.xml.append(event.xml)
+            event.render(out, depth + 1, indent, newline)
+        out.append(f"{padding}</trace>{newline}")
 
     def __str__(self) -> str:
-        result: str = ET.dump(self.xml)  # type: ignore[func-returns-value]
-        return result
+        return _to_string(self)
+
+
+class AttributeSchema:
+    """
+    The keys and types of attributes, gathered in a single pass.
+
+    Types are added as values stream by and only one type is kept per key, in
+    the order keys are first seen, so the memory used depends on the number
+    of columns rather than of events. A key seen with different types is
+    widened: to a float for ints and floats, to a string otherwise.
+    """
+
+    __slots__ = ("types",)
+
+    def __init__(self) -> None:
+        self.types: dict[str, str] = {}
+
+    def add(self, key: str, type: str) -> None:
+        seen = self.types.setdefault(key, type)
+        if seen != type:
+            numbers = {seen, type} <= {"int", "float"}
+            self.types[key] = "float" if numbers else "string"
+
+    def attributes(self) -> list[Attribute]:
+        """Build a global attribute with the default value of its type per key."""
+        return [
+            Attribute(type=type, key=key, value=DEFAULTS.get(type, ""))
+            for key, type in self.types.items()
+        ]
+
+    def apply(self, log: "XES") -> None:
+        """Declare the keys as the event globals of ``log``."""
+        log.global_event_attributes = []
+        for attribute in self.attributes():
+            log.add_global_event_attribute(attribute)
 
 
 class XES:
     """An XES log class for adding traces to."""
 
     def __init__(self) -> None:
-        self.log = ET.Element("log")
-        self.log.set("xes.version", "2.0")
-        self.log.set("xes.features", "arbitraty-depth")
-
         self.attributes: list[Attribute] = []
         self.traces: list[Trace] = []
         self.extensions: list[Extension] = []
@@ -182,46 +327,97 @@ class XES:
             ),
         ]
 
-    def build_log(self) -> None:
+    def header(self, indent: str | None = "  ") -> str:
+        """
+        Serialize everything that precedes the traces.
+
+        That is the XML declaration, the opening ``log`` tag, extensions,
+        globals, classifiers and log attributes.
+        """
         if len(self.classifiers) == 0:
             print("XES Warning! Classifiers not set. \n")
 
         if self.use_default_extensions:
             self.add_default_extensions()
 
+        pad, newline = (indent, "\n") if indent is not None else ("", "")
+        out = [
+            f'<?xml version="1.0" ?>{newline}',
+            f'<log xes.version="2.0" xes.features="arbitraty-depth">{newline}',
+        ]
         for extension in self.extensions:
-            self.log.append(extension.xml)
-
-        if global_trace := self.global_trace_attributes:
-            trace_element = ET.SubElement(self.log, "global")
-            trace_element.set("scope", "trace")
-            for trace_attr in global_trace:
-                trace_element.append(trace_attr.xml)
-
-        if global_events := self.global_event_attributes:
-            event_element = ET.SubElement(self.log, "global")
-            event_element.set("scope", "event")
-            for event_attr in global_events:
-                event_element.append(event_attr.xml)
+            extension.render(out, 1, pad, newline)
+
+        for scope, attributes in (
+            ("trace", self.global_trace_attributes),
+            ("event", self.global_event_attributes),
+        ):
+            if not attributes:
+                continue
+            out.append(f'{pad}<global scope="{scope}">{newline}')
+            for attr in attributes:
+                attr.render(out, 2, pad, newline)
+            out.append(f"{pad}</global>{newline}")
 
         for classifier in self.classifiers:
-            self.log.append(classifier.xml)
+            classifier.render(out, 1, pad, newline)
 
         for attr in self.attributes:
-            self.log.append(attr.xml)
-
-        log_data = ET.SubElement(self.log, "string")
-        log_data.set("key", "concept:name")
-        log_data.set("value", "XES Event Log")
-
-        for trace in self.traces:
-            for event in trace.events:
-                event.build_event()
-            trace.build_trace()
-            self.log.append(trace.xml)
+            attr.render(out, 1, pad, newline)
+
+        out.append(f'{pad}<string key="concept:name" value="XES Event Log"/>{newline}')
+        return "".join(out)
+
+    def footer(self, indent: str | None = "  ") -> str:
+        """Serialize the closing of the log."""
+        return "</log>\n" if indent is not None else "</log>"
+
+    @staticmethod
+    def serialize_trace(trace: Trace, indent: str | None = "  ") -> str:
+        """Serialize a single trace as it would be placed inside the log."""
+        out: list[str] = []
+        if indent is None:
+            trace.render(out, 0, "", "")
+        else:
+            trace.render(out, 1, indent, "\n")
+        return "".join(out)
+
+    def iter_xml(
+        self,
+        traces: collections.abc.Iterable[Trace] | None = None,
+        indent: str | None = "  ",
+    ) -> collections.abc.Iterator[str]:
+        """
+        Serialize the log incrementally.
+
+        The header is yielded once and then every trace is yielded as soon as
+        it is consumed from ``traces`` (defaults to the traces added to the
+        log), so only one trace has to be kept in memory at a time.
+        Passing ``indent=None`` produces the compact form without whitespace.
+        """
+        yield self.header(indent)
+        for trace in self.traces if traces is None else traces:
+            yield self.serialize_trace(trace, indent)
+        yield self.footer(indent)
+
+    def write_to(
+        self,
+        fileobj: typing.IO[bytes],
+        traces: collections.abc.Iterable[Trace] | None = None,
+        indent: str | None = "  ",
+        encoding: str = "utf-8",
+    ) -> int:
+        """
+        Write the log into a binary file object, one trace at a time.
+
+        :returns: the number of bytes written.
+        """
+        written = 0
+        for chunk in self.iter_xml(traces, indent):
+            data = chunk.encode(encoding)
+            fileobj.write(data)
+            written += len(data)
+        return written
 
     def __str__(self) -> str:
-        self.build_log()
-        stuff = minidom.parseString(ET.tostring(self.log, "UTF-8", method="xml"))
-
-        return stuff.toprettyxml("  ")
+        return "".join(self.iter_xml())
@@ -22,3 +22,29 @@ class NotFound(BaseError):
             ),
             "code": "not_found" if not entity else f"{entity}_not_found",
         }
+
+
+class InProgress(BaseError):
+    """Error to be returned when the same work is already being done."""
+
+    def __init__(self, entity: str | None = None) -> None:
+        self.output = {
+            "status_code": 409,
+            "message": (
+                "The entity is already being processed."
+                if not entity
+                else f"The entity {entity.capitalize()} is already being processed."
+            ),
+            "code": "in_progress" if not entity else f"{entity}_in_progress",
+        }
+
+
+class Overloaded(BaseError):
+    """Error to be returned when there's no capacity left, so it's retried."""
+
+    def __init__(self) -> None:
+        self.output = {
+            "status_code": 429,
+            "message": "Too many conversions in progress, try again later.",
+            "code": "overloaded",
+        }
@@ -0,0 +1,52 @@
+"""Module containing the executor for CPU bound work."""
+
+import asyncio
+import collections.abc
+import concurrent.futures
+import functools
+import multiprocessing
+import typing
+
+P = typing.ParamSpec("P")
+T = typing.TypeVar("T")
+
+
+class ConversionExecutor:
+    """
+    Runs CPU bound conversions in a pool of worker processes.
+
+    Keeps the event loop free to answer other requests while a file is being
+    converted. The pool is only started on first use and its processes are
+    spawned, not forked, since the parent holds gRPC channels and threads.
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self.max_workers = max_workers
+        self._pool: concurrent.futures.ProcessPoolExecutor | None = None
+
+    @property
+    def pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def run(
+        self,
+        func: collections.abc.Callable[P, T],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        """Run ``func`` in a worker process and wait for its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.pool, functools.partial(func, *args, **kwargs)
+        )
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
@@ -1,20 +1,23 @@
 """Module containing factory to build app."""
 
-import functools
+import asyncio
+import collections.abc
+import contextlib
 import logging
 
 import fastapi
 import fastapi_injector
 import injector
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 
-from api import errors, routers, typings
+from api import dependencies, errors, routers, typings
 
 from .middleware import (
+    DEFAULT_SAMPLE_RATES,
+    LoggingMiddleware,
     default_error_handler,
     error_handler,
-    logging_middleware,
+    parse_sample_rates,
 )
 
 logger = logging.getLogger(__name__)
@@ -23,7 +26,18 @@ logger = logging.getLogger(__name__)
 def create_app(container: injector.Injector) -> fastapi.FastAPI:
     """Creates fastapi app."""
     setts = container.get(typings.Settings)
-    app = fastapi.FastAPI(title="XES-UFF")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_: fastapi.FastAPI) -> collections.abc.AsyncIterator[None]:
+        warming = None
+        if setts.get("warm_up", "false").lower() == "true":
+            warming = asyncio.create_task(dependencies.warm_up(container))
+        yield
+        if warming is not None:
+            await warming
+        await dependencies.close(container)
+
+    app = fastapi.FastAPI(title="XES-UFF", lifespan=lifespan)
 
     app.add_middleware(fastapi_injector.InjectorMiddleware, injector=container)
     app.add_middleware(
@@ -33,10 +47,13 @@ def create_app(container: injector.Injector) -> fastapi.FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    logging_func = functools.partial(
-        logging_middleware, project_id=setts.get("project_id")
+    app.add_middleware(
+        LoggingMiddleware,
+        project_id=setts.get("project_id"),
+        sample_rates=parse_sample_rates(
+            setts.get("log_sample_rates", DEFAULT_SAMPLE_RATES)
+        ),
     )
-    app.add_middleware(BaseHTTPMiddleware, dispatch=logging_func)
 
     app.include_router(routers.base_router, prefix="/api/v1")
 
@@ -0,0 +1,103 @@
+"""
+Module containing the Prometheus metrics of the service.
+
+Under gunicorn every worker process records into its own files in
+``PROMETHEUS_MULTIPROC_DIR`` (see ``gunicorn.conf.py``), which are summed up
+when scraped, so any worker answers for all of them. Without it, as when
+running a single uvicorn process, the metrics live in the process' registry.
+The directory is created on import when missing, as for the worker, which
+runs without gunicorn.
+"""
+
+import os
+
+import prometheus_client
+from prometheus_client import multiprocess
+
+from api.domain.instrumentation import ConversionStats
+
+if directory := os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(directory, exist_ok=True)
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    float("inf"),
+)
+
+CONVERSION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+REQUEST_LATENCY = prometheus_client.Histogram(
+    "http_request_duration_seconds",
+    "Latency of the HTTP requests.",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+ERRORS = prometheus_client.Counter(
+    "errors", "Errors answered to requests, by error code.", ("code",)
+)
+CONVERSIONS_IN_PROGRESS = prometheus_client.Gauge(
+    "conversions_in_progress",
+    "Conversions being run.",
+    multiprocess_mode="livesum",
+)
+CONVERSIONS = prometheus_client.Counter(
+    "conversions", "Finished conversions, by outcome.", ("outcome",)
+)
+CONVERSION_DURATION = prometheus_client.Histogram(
+    "conversion_duration_seconds",
+    "Time spent converting a file, waiting and mailing included.",
+    buckets=CONVERSION_BUCKETS,
+)
+CONVERSION_STAGES = prometheus_client.Counter(
+    "conversion_stage_seconds", "Time spent in each stage of conversions.", ("stage",)
+)
+CONVERSION_ROWS = prometheus_client.Counter(
+    "conversion_rows", "Rows read by conversions."
+)
+CONVERSION_EVENTS = prometheus_client.Counter(
+    "conversion_events", "Events written by conversions."
+)
+CONVERSION_BYTES = prometheus_client.Counter(
+    "conversion_bytes", "Bytes processed by conversions.", ("direction",)
+)
+RESULT_CACHE = prometheus_client.Counter(
+    "result_cache_requests", "Lookups of conversion results.", ("result",)
+)
+
+
+def record_conversion(stats: ConversionStats) -> None:
+    """Add the measurements of a finished conversion."""
+    if stats.cached:
+        CONVERSIONS.labels("cached").inc()
+        return
+    CONVERSIONS.labels("converted").inc()
+    CONVERSION_DURATION.observe(sum(stats.stages.values()))
+    for stage, seconds in stats.stages.items():
+        CONVERSION_STAGES.labels(stage).inc(seconds)
+    CONVERSION_ROWS.inc(stats.rows)
+    CONVERSION_EVENTS.inc(stats.events)
+    CONVERSION_BYTES.labels("in").inc(stats.bytes_in)
+    CONVERSION_BYTES.labels("out").inc(stats.bytes_out)
+
+
+def exposition() -> tuple[bytes, str]:
+    """Render the metrics of every worker, along with their content type."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    else:
+        registry = prometheus_client.REGISTRY
+    content = prometheus_client.generate_latest(registry)
+    return content, prometheus_client.CONTENT_TYPE_LATEST
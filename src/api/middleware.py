@@ -1,80 +1,143 @@
 """Middleware file for the connector runtime."""
 
 # pylint: disable=import-private-name
-import collections.abc
 import logging
+import random
 import time
 import typing
 
 import fastapi
 import pydantic
-import starlette.responses
+import starlette.datastructures
+import starlette.types
 
-from api import errors
-
-NextCall = collections.abc.Callable[
-    [fastapi.Request], collections.abc.Awaitable[starlette.responses.Response]
-]
+from api import errors, metrics
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SAMPLE_RATES = "/api/v1/healthz=0.01,/api/v1/tasks/{task_id}=0.1"
+
 
-# pylint: disable=unused-argument
-async def logging_middleware(
-    request: fastapi.Request,
-    call_next: NextCall,
-    project_id: str | None = None,
-) -> fastapi.Response:
-    """Log data from request and response.
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """Parse ``route=rate`` pairs separated by commas, as in the settings."""
+    rates = {}
+    for pair in value.split(","):
+        if pair.strip():
+            route, rate = pair.rsplit("=", 1)
+            rates[route.strip()] = float(rate)
+    return rates
 
-    Intercepts the request and starts a timer,
-    calls back the endpoint and then logs the request,
-    response and latency.
 
-    :returns: the response back to the app.
+class LoggingMiddleware:
     """
-    start_time = time.perf_counter()
-
-    try:
-        response: starlette.responses.Response = await call_next(request)
-    except Exception as exc:
-        response = await handle_handlers(request, exc)
-
-    process_time = time.perf_counter() - start_time
-    request_url = request.url.path
-
-    http_request = {
-        "requestMethod": request.method,
-        "requestUrl": request_url,
-        "requestSize": request.headers.get("content-length"),
-        "status": response.status_code,
-        "responseSize": response.headers.get("content-length"),
-        "userAgent": request.headers.get("user-agent"),
-        "remoteIp": request.client.host if request.client else None,
-        "latency": process_time,
-    }
-
-    if response.status_code >= 500:
-        level = logging.ERROR
-    elif response.status_code >= 400:
-        level = logging.WARNING
-    else:
-        level = logging.INFO
-    extra: dict[str, typing.Any] = {}
-    if "x-cloud-trace-context" in request.headers:
-        trace_id = request.headers.get("x-cloud-trace-context", "").split("/")[0]
-        extra["logging.googleapis.com/trace"] = (
-            f"project/{project_id}/traces/{trace_id}"
+    Log the request, response and latency of every HTTP request.
+
+    A plain ASGI middleware, so messages are passed through as they come and
+    streaming bodies aren't buffered. The latency spans until the last byte
+    of the body is sent. Unhandled errors are answered with the app's error
+    handlers.
+
+    Successful responses of the routes in ``sample_rates`` (route templates,
+    such as ``/api/v1/tasks/{task_id}``) are only logged for that fraction of
+    the requests; errors are always logged and every request is measured.
+    """
+
+    def __init__(
+        self,
+        app: starlette.types.ASGIApp,
+        project_id: str | None = None,
+        sample_rates: dict[str, float] | None = None,
+    ) -> None:
+        self.app = app
+        self.project_id = project_id
+        self.sample_rates = sample_rates or {}
+
+    async def __call__(
+        self,
+        scope: starlette.types.Scope,
+        receive: starlette.types.Receive,
+        send: starlette.types.Send,
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        response_start: starlette.types.Message | None = None
+
+        async def send_wrapper(message: starlette.types.Message) -> None:
+            nonlocal response_start
+            if message["type"] == "http.response.start":
+                response_start = message
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if response_start is not None:
+                # Too late to answer with an error, it can only be logged.
+                logger.exception(exc)
+                raise
+            request = fastapi.Request(scope, receive)
+            response = await handle_handlers(request, exc)
+            await response(scope, receive, send_wrapper)
+
+        process_time = time.perf_counter() - start_time
+        status = response_start["status"] if response_start else 500
+        # The route template rather than the path, to keep the labels bounded.
+        route = getattr(scope.get("route"), "path", "unmatched")
+        metrics.REQUEST_LATENCY.labels(scope["method"], route, status).observe(
+            process_time
+        )
+        rate = self.sample_rates.get(route, 1.0) if status < 400 else 1.0
+        if rate >= 1.0 or random.random() < rate:
+            self.log(scope, response_start, status, process_time)
+
+    def log(
+        self,
+        scope: starlette.types.Scope,
+        response_start: starlette.types.Message | None,
+        status: int,
+        process_time: float,
+    ) -> None:
+        """Write the log record of a request."""
+        headers = starlette.datastructures.Headers(scope=scope)
+        response_headers = starlette.datastructures.Headers(
+            raw=response_start.get("headers", []) if response_start else []
         )
-    extra["httpRequest"] = http_request
-    logger.log(level, "response", extra=extra)
-    return response
+        client = scope.get("client")
+        http_request = {
+            "requestMethod": scope["method"],
+            "requestUrl": scope["path"],
+            "requestSize": headers.get("content-length"),
+            "status": status,
+            "responseSize": response_headers.get("content-length"),
+            "userAgent": headers.get("user-agent"),
+            "remoteIp": client[0] if client else None,
+            "latency": process_time,
+        }
+
+        if status >= 500:
+            level = logging.ERROR
+        elif status >= 400:
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        extra: dict[str, typing.Any] = {}
+        if "x-cloud-trace-context" in headers:
+            trace_id = headers.get("x-cloud-trace-context", "").split("/")[0]
+            extra["logging.googleapis.com/trace"] = (
+                f"project/{self.project_id}/traces/{trace_id}"
+            )
+        extra["httpRequest"] = http_request
+        logger.log(level, "response", extra=extra)
 
 
 async def error_handler(
     request: fastapi.Request, exc: errors.BaseError
 ) -> fastapi.responses.Response:
     """Error handler for custom errors."""
+    metrics.ERRORS.labels(exc.output.get("code", "unknown")).inc()
     return fastapi.responses.JSONResponse(
         status_code=exc.output.get("status_code", 400), content=exc.output
     )
@@ -89,6 +152,7 @@ async def default_error_handler(
         case pydantic.ValidationError():
             status_code = fastapi.status.HTTP_422_UNPROCESSABLE_ENTITY
             resp = [dict(error) for error in exc.errors()]
+            metrics.ERRORS.labels("validation_error").inc()
         case _:
             logger.exception(exc)
             status_code = fastapi.status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -97,6 +161,7 @@ async def default_error_handler(
                 "code": "unexpected_server_error",
                 "message": "There was an unexpected server error.",
             }
+            metrics.ERRORS.labels("unexpected_server_error").inc()
 
     return fastapi.responses.JSONResponse(
         status_code=status_code,
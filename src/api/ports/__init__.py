@@ -1,11 +1,15 @@
 from .memory_storage import MemoryStorage
+from .message_consumer import MessageConsumer
 from .message_publisher import MessagePublisher
 from .notification import Notification
+from .result_cache import ResultCache
 from .storage import Storage
 
 __all__ = (
+    "MessageConsumer",
     "MessagePublisher",
     "MemoryStorage",
     "Notification",
+    "ResultCache",
     "Storage",
 )
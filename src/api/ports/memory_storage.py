@@ -19,7 +19,25 @@ class MemoryStorage(abc.ABC):
         """
 
     @abc.abstractmethod
-    def set(self, key: str | uuid.UUID, value: typing.Any) -> None:
+    def set(
+        self, key: str | uuid.UUID, value: typing.Any, ttl: float | None = None
+    ) -> None:
         """
-        Set a value on the storage.
+        Set a value on the storage, for ``ttl`` seconds if given.
+        """
+
+    @abc.abstractmethod
+    def add(
+        self, key: str | uuid.UUID, value: typing.Any, ttl: float | None = None
+    ) -> bool:
+        """
+        Atomically set a value unless the key already has one.
+
+        :returns: whether the value was set.
+        """
+
+    @abc.abstractmethod
+    def delete(self, key: str | uuid.UUID) -> None:
+        """
+        Remove a value from the storage.
         """
@@ -0,0 +1,25 @@
+"""
+Module related to the port of the message consumer.
+"""
+
+import abc
+import collections.abc
+
+from api import typings
+
+Handler = collections.abc.Callable[[typings.Delivery], collections.abc.Awaitable[None]]
+
+
+class MessageConsumer(abc.ABC):
+    """
+    Port related to message consumer.
+    """
+
+    @abc.abstractmethod
+    async def consume(self, handler: Handler) -> None:
+        """
+        Consume messages until cancelled.
+
+        A message is acked once ``handler`` returns and redelivered later if
+        it raises.
+        """
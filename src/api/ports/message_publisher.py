@@ -3,6 +3,7 @@ Module related to the port of the secret manager.
 """
 
 import abc
+import collections.abc
 
 from api import typings
 
@@ -17,3 +18,22 @@ class MessagePublisher(abc.ABC):
         """
         Publish to a message queue.
         """
+
+    @abc.abstractmethod
+    async def publish_many(
+        self,
+        messages: collections.abc.Iterable[typings.Message],
+        topic: str | None = None,
+    ) -> None:
+        """
+        Publish several messages to a message queue at once.
+        """
+
+    @abc.abstractmethod
+    def warm_up(self) -> None:
+        """
+        Prepare the clients ahead of their first use.
+
+        Optional, clients are created on first use otherwise. Called from the
+        event loop the publisher is used in, which async clients bind to.
+        """
@@ -11,3 +11,8 @@ class Notification(abc.ABC):
     async def send(self, email: str, template_file: str, **kwargs: typing.Any) -> bool:
         """Sends the notification."""
         raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        """Sends what's pending and releases the resources held."""
+        raise NotImplementedError()
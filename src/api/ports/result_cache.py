@@ -0,0 +1,39 @@
+"""
+Module containing result cache abstract.
+"""
+
+import abc
+import typing
+
+
+class ResultCache(abc.ABC):
+    """
+    Result Cache abstract.
+
+    Maps a content key to a previously computed result, evicting entries as it
+    sees fit.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> typing.Any:
+        """
+        Get a cached result, ``None`` when there isn't one.
+        """
+
+    @abc.abstractmethod
+    def set(self, key: str, value: typing.Any) -> None:
+        """
+        Cache a result.
+        """
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Drop a cached result that turned out to be stale.
+        """
+
+    @abc.abstractmethod
+    def stats(self) -> dict[str, int]:
+        """
+        Counters of the cache, such as hits and misses.
+        """
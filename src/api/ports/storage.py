@@ -1,25 +1,59 @@
 """Module containing storage abstract."""
 
 import abc
+import contextlib
+import typing
+
+from api import typings
 
 
 class Storage(abc.ABC):
     """Storage abstract."""
 
-    @abc.abstractmethod
-    async def upload_by_file(self, path: str, audio_path: str) -> str:
-        """Method that uploads a file by name."""
-
     @abc.abstractmethod
     async def upload_by_text(self, path: str, text: bytes, content_type: str) -> str:
         """Method that uploads a file by bytes."""
 
     @abc.abstractmethod
-    async def download(self, uri: str, file_name: str) -> str:
-        """Method that downloads a file."""
+    async def stat(self, path: str) -> typings.ObjectInfo | None:
+        """
+        Method that fetches the metadata of a file, ``None`` if it's missing.
+
+        ``path`` is either an uri or a path in the storage.
+        """
 
     @abc.abstractmethod
     async def generate_signed_url(
         self, path: str, mimetype: str, method: str = "PUT"
     ) -> str:
         """Method to generate a signed url."""
+
+    @abc.abstractmethod
+    def open_read(
+        self, uri: str
+    ) -> contextlib.AbstractContextManager[typing.IO[bytes]]:
+        """
+        Method that opens a file to be read as a stream, chunk by chunk.
+
+        Blocking, meant to be used from worker threads or processes.
+        """
+
+    @abc.abstractmethod
+    def open_write(
+        self, path: str, content_type: str
+    ) -> contextlib.AbstractContextManager[typing.IO[bytes]]:
+        """
+        Method that opens a file to be uploaded as a stream.
+
+        The upload is only committed if the context exits without errors.
+        Blocking, meant to be used from worker threads or processes.
+        """
+
+    @abc.abstractmethod
+    def warm_up(self) -> None:
+        """
+        Method that prepares the clients ahead of their first use.
+
+        Optional, clients are created on first use otherwise. Blocking, meant
+        to be used from worker threads.
+        """
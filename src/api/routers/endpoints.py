@@ -3,20 +3,15 @@ Base router.
 """
 
 import base64
-import datetime
-import io
 import logging
 import uuid
-from collections import defaultdict
 
-import aiocsv
-import aiofiles
 import fastapi
 import fastapi_injector
-from dateutil import parser
 
-from api import ports, typings
-from api.domain import xes
+from api import errors, metrics, ports, typings
+from api.scheduler import ConversionScheduler
+from api.service import ConversionService
 
 from . import schemas
 
@@ -46,6 +41,26 @@ async def get_task_status(
     return fastapi.responses.JSONResponse(status_code=200, content=task)
 
 
+@router.get("/stats")
+async def get_stats(
+    results: ports.ResultCache = fastapi_injector.Injected(ports.ResultCache),
+    scheduler: ConversionScheduler = fastapi_injector.Injected(ConversionScheduler),
+) -> dict[str, dict[str, int]]:
+    """
+    Counters of this worker, such as the result cache hits and misses.
+    """
+    return {"result_cache": results.stats(), "scheduler": scheduler.stats()}
+
+
+@router.get("/metrics")
+def get_metrics() -> fastapi.Response:
+    """
+    Metrics of every worker, in the Prometheus text format.
+    """
+    content, media_type = metrics.exposition()
+    return fastapi.Response(content=content, media_type=media_type)
+
+
 @router.post("/signed")
 async def generate_signed_url(
     body: schemas.GetSignedUrl = fastapi.Body(...),
@@ -62,13 +77,50 @@ async def generate_signed_url(
 
 @router.post("/convert")
 async def convert(
+    background_tasks: fastapi.BackgroundTasks,
     publisher: ports.MessagePublisher = fastapi_injector.Injected(
         ports.MessagePublisher
     ),
     tasks: ports.MemoryStorage = fastapi_injector.Injected(ports.MemoryStorage),
+    settings: typings.Settings = fastapi_injector.Injected(typings.Settings),
+    notification: ports.Notification = fastapi_injector.Injected(ports.Notification),
+    storage: ports.Storage = fastapi_injector.Injected(ports.Storage),
+    service: ConversionService = fastapi_injector.Injected(ConversionService),
     body: schemas.ConvertXES = fastapi.Body(...),
 ) -> schemas.ConvertXESResponse:
+    """
+    Convert a file to XES.
+
+    Files up to ``inline_conversion_max_size`` bytes are converted right away
+    when there's capacity for them and the response carries the url of the
+    result; larger ones, or those that would have to wait, are queued.
+    """
     task_id = uuid.uuid4()
+    source, target = service.locate(body.file)
+    max_size = int(settings.get("inline_conversion_max_size", "1048576"))
+    info = await storage.stat(source) if max_size > 0 else None
+    if info and info.size <= max_size:
+        try:
+            url, stats = await service.convert(
+                source,
+                target,
+                service.options(body.keys, body.delimiter, body.presorted),
+                wait=False,
+            )
+        except errors.Overloaded:
+            logger.info("No capacity to convert %s inline, queueing it.", source)
+        else:
+            service.done(task_id, url, stats)
+            background_tasks.add_task(
+                notification.send,
+                body.email_address,
+                settings.get("template", ""),
+                url=url,
+            )
+            return schemas.ConvertXESResponse(task_id=task_id, status="done", url=url)
+
+    # Set before publishing, the message could be handled before it returns.
+    tasks.set(task_id, {"status": "processing"})
     await publisher.publish(
         schemas.ConvertAsyncTask(
             task_id=task_id,
@@ -76,9 +128,9 @@ async def convert(
             email_address=body.email_address,
             keys=body.keys,
             delimiter=body.delimiter,
+            presorted=body.presorted,
         )
     )
-    tasks.set(task_id, {"status": "processing"})
     return schemas.ConvertXESResponse(
         task_id=task_id,
         status="processing",
@@ -88,92 +140,27 @@ async def convert(
 @router.post("/_pubsub")
 async def async_convert(
     pubsub_body: schemas.PubsubRequest = fastapi.Body(...),
-    settings: typings.Settings = fastapi_injector.Injected(typings.Settings),
-    notification: ports.Notification = fastapi_injector.Injected(ports.Notification),
-    tasks: ports.MemoryStorage = fastapi_injector.Injected(ports.MemoryStorage),
-    storage: ports.Storage = fastapi_injector.Injected(ports.Storage),
+    service: ConversionService = fastapi_injector.Injected(ConversionService),
 ) -> fastapi.Response:
     """
     Convert the file to a different format.
+
+    The conversion itself runs in the conversion executor's worker processes,
+    streaming the file from storage and the result back into it. When the
+    scheduler turns it down it answers 429, so Pub/Sub redelivers it later.
+
+    Deliveries are at least once: redeliveries of done tasks are acked right
+    away and those of tasks being converted, under a lease in the task store,
+    answer 409 to be retried later in case the conversion fails.
     """
     body = schemas.AsyncTaskRequest.parse_raw(
         base64.b64decode(pubsub_body.message.data.decode("utf-8"))
     )
-    file_data = body.url
-    _, file_name = file_data.rsplit("/", 1)
-    file_stripped = (
-        file_data.replace("https://", "")
-        .replace("http://", "")
-        .replace("storage.googleapis.com/", "")
-        .replace("storage.cloud.google.com/", "")
-    )
-    file_path = await storage.download(f"gs://{file_stripped}", file_name)
-    traces = defaultdict(list)
-    xes_tracker = xes.XES()
-
-    xes_tracker.use_default_extensions = True
-    xes_tracker.classifiers = [
-        xes.Classifier(name="Event Name", keys="concept:name"),
-    ]
-    xes_tracker.add_global_trace_attributes(
-        xes.Attribute(type="string", key="concept:name", value="")
-    )
-    mapping = body.keys
-    case_column = mapping.pop("concept:id")
-    async with aiofiles.open(file_path, encoding="utf-8") as f:
-        reader = aiocsv.AsyncDictReader(f, delimiter=body.delimiter)
-        async for row in reader:
-            event_data = {}
-            case_id = row.pop(case_column)
-            for key, to_key in mapping.items():
-                event_data[key] = row.pop(to_key)
-            for k, v in row.items():
-                event_data[k] = v
-            traces[case_id].append(event_data)
-    for trace_id in traces:
-        t = xes.Trace()
-        t.attributes = [
-            xes.Attribute(type="string", key="concept:name", value=trace_id)
-        ]
-        event: dict[str, str]
-        for event in traces[trace_id]:
-            e = xes.Event()
-            if not (popped_date := event.pop("time:timestamp")):
-                continue
-            date = parser.parse(popped_date)
-            date = date.replace(tzinfo=datetime.UTC)
-            e.attributes = [
-                xes.Attribute(
-                    type="string", key="concept:name", value=event.pop("concept:name")
-                ),
-                xes.Attribute(
-                    type="date",
-                    key="time:timestamp",
-                    value=date.isoformat(timespec="milliseconds"),
-                ),
-                *[
-                    xes.Attribute(type="string", key=k, value=v)
-                    for k, v in event.items()
-                ],
-            ]
-            t.add_event(e)
-        xes_tracker.add_trace(t)
-    for attr in e.attributes:
-        val = ""
-        if attr.type == "date":
-            val = "1970-01-01T00:00:00.000+00:00"
-        xes_tracker.add_global_event_attribute(
-            xes.Attribute(type=attr.type, key=attr.key, value=val)
-        )
-    with io.BytesIO() as xes_file:
-        xes_file.write(str(xes_tracker).encode("utf-8"))
-        upload_name = f"{file_name.rsplit('.')[0]}.xes"
-        await storage.upload_by_text(
-            upload_name, xes_file.getvalue(), content_type="application/xml+xes"
-        )
-    url = await storage.generate_signed_url(
-        upload_name, mimetype="application/xml+xes", method="GET"
+    await service.process(
+        body.task_id,
+        body.url,
+        body.email_address,
+        service.options(body.keys, body.delimiter, body.presorted),
+        pubsub_body.message.message_id,
     )
-    tasks.set(body.task_id, {"status": "done", "url": url})
-    await notification.send(body.email_address, settings.get("template", ""), url=url)
     return fastapi.Response(status_code=200)
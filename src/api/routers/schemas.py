@@ -20,6 +20,7 @@ class ConvertXES(pydantic.BaseModel):
     email_address: pydantic.EmailStr
     keys: dict[str, str]
     delimiter: str = ";"
+    presorted: bool = False
 
 
 class ConvertXESResponse(pydantic.BaseModel):
@@ -29,6 +30,7 @@ class ConvertXESResponse(pydantic.BaseModel):
 
     task_id: uuid.UUID
     status: typing.Literal["processing", "done", "error"]
+    url: str | None = None
 
 
 class GetSignedUrl(pydantic.BaseModel):
@@ -52,6 +54,7 @@ class ConvertAsyncTask(typings.Message):
     email_address: str
     keys: dict[str, str]
     delimiter: str = ";"
+    presorted: bool = False
 
 
 class PubsubMessage(pydantic.BaseModel, extra=pydantic.Extra.allow):
@@ -82,3 +85,4 @@ class AsyncTaskRequest(pydantic.BaseModel):
     email_address: str
     keys: dict[str, str]
     delimiter: str
+    presorted: bool = False
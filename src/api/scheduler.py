@@ -0,0 +1,114 @@
+"""Module containing the admission control of conversions."""
+
+import asyncio
+import collections.abc
+import contextlib
+import logging
+import os
+
+from api import errors
+
+logger = logging.getLogger(__name__)
+
+
+def available_memory() -> int:
+    """Memory available to the process: its cgroup limit or the host memory."""
+    for path in (
+        "/sys/fs/cgroup/memory.max",
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+    ):
+        try:
+            with open(path, encoding="utf-8") as file:
+                limit = file.read().strip()
+        except OSError:
+            continue
+        if limit.isdigit() and int(limit) < 1 << 60:
+            return int(limit)
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+class ConversionScheduler:
+    """
+    Admits conversions while there's capacity to run them.
+
+    At most ``max_running`` conversions run at once, and only while the memory
+    they are estimated to take (``memory_factor`` times their input size)
+    fits in ``memory_budget``; a conversion running alone is always admitted.
+    Up to ``max_waiting`` others wait until they fit and the rest are rejected
+    with ``errors.Overloaded``, so they are retried later. Conversions that
+    can't wait, such as those answered inline, are rejected unless they fit
+    right away.
+    """
+
+    def __init__(
+        self,
+        max_running: int,
+        max_waiting: int,
+        memory_budget: int,
+        memory_factor: float,
+    ) -> None:
+        self.max_running = max_running
+        self.max_waiting = max_waiting
+        self.memory_budget = memory_budget
+        self.memory_factor = memory_factor
+        self.running = 0
+        self.waiting = 0
+        self.reserved = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._condition = asyncio.Condition()
+
+    def _fits(self, memory: int) -> bool:
+        if self.running >= self.max_running:
+            return False
+        return not self.running or self.reserved + memory <= self.memory_budget
+
+    @contextlib.asynccontextmanager
+    async def admit(
+        self, size: int, wait: bool = True
+    ) -> collections.abc.AsyncIterator[None]:
+        """
+        Hold a slot for a conversion of an input of ``size`` bytes.
+
+        :raises errors.Overloaded: if it can't even wait for a slot, or if it
+            doesn't fit right away and ``wait`` is false.
+        """
+        memory = int(size * self.memory_factor)
+        if self.waiting or not self._fits(memory):
+            if not wait:
+                raise errors.Overloaded()
+            if self.waiting >= self.max_waiting:
+                self.rejected += 1
+                logger.warning(
+                    "Rejecting conversion of %s bytes, %s running and %s waiting.",
+                    size,
+                    self.running,
+                    self.waiting,
+                )
+                raise errors.Overloaded()
+            self.waiting += 1
+            try:
+                async with self._condition:
+                    await self._condition.wait_for(lambda: self._fits(memory))
+            finally:
+                self.waiting -= 1
+        self.running += 1
+        self.reserved += memory
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.reserved -= memory
+            async with self._condition:
+                self._condition.notify_all()
+
+    def stats(self) -> dict[str, int]:
+        """Current load and admission counters."""
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "reserved_memory": self.reserved,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
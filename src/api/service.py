@@ -0,0 +1,218 @@
+"""Module containing the conversion service."""
+
+import asyncio
+import collections.abc
+import contextlib
+import functools
+import logging
+import time
+import uuid
+
+from api import errors, metrics, ports, typings
+from api.domain import conversion, ingest
+from api.domain.instrumentation import ConversionStats
+from api.executor import ConversionExecutor
+from api.scheduler import ConversionScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class ConversionService:
+    """
+    Runs conversion tasks, whichever way they are delivered.
+
+    Shared by the push endpoint and the pull worker.
+    """
+
+    def __init__(
+        self,
+        settings: typings.Settings,
+        tasks: ports.MemoryStorage,
+        storage: ports.Storage,
+        results: ports.ResultCache,
+        notification: ports.Notification,
+        executor: ConversionExecutor,
+        scheduler: ConversionScheduler,
+    ) -> None:
+        self.settings = settings
+        self.tasks = tasks
+        self.storage = storage
+        self.results = results
+        self.notification = notification
+        self.executor = executor
+        self.scheduler = scheduler
+
+    async def process(
+        self,
+        task_id: uuid.UUID,
+        url: str,
+        email_address: str,
+        options: conversion.ConversionOptions,
+        message_id: str,
+    ) -> None:
+        """
+        Convert the file of a task, mail its url and mark the task as done.
+
+        The measurements of the conversion are logged as a single record and
+        kept with the task.
+
+        Deliveries are at least once: tasks already done are skipped and
+        tasks being converted, under a lease in the task store, are refused.
+        Whether the task is done is checked again once leased, since another
+        delivery may have finished it and let go of the lease in between.
+
+        :raises errors.InProgress: if the task is leased by another delivery.
+        :raises errors.Overloaded: if the scheduler has no room for it.
+        """
+        if self._is_done(task_id, message_id):
+            return
+
+        source, target = self.locate(url)
+        async with self._lease(task_id, message_id):
+            if self._is_done(task_id, message_id):
+                return
+            result, stats = await self.convert(source, target, options)
+            with stats.stage("email"):
+                await self.notification.send(
+                    email_address, self.settings.get("template", ""), url=result
+                )
+            self.done(task_id, result, stats)
+
+    def done(self, task_id: uuid.UUID, url: str, stats: ConversionStats) -> None:
+        """Mark a task as done, logging and recording its measurements."""
+        metrics.record_conversion(stats)
+        measurements = stats.as_dict()
+        logger.info(
+            "Converted task %s.",
+            task_id,
+            extra={"conversion": {"task_id": str(task_id), **measurements}},
+        )
+        self.tasks.set(task_id, {"status": "done", "url": url, "stats": measurements})
+
+    async def convert(
+        self,
+        source: str,
+        target: str,
+        options: conversion.ConversionOptions,
+        wait: bool = True,
+    ) -> tuple[str, ConversionStats]:
+        """
+        Convert ``source`` into ``target`` and return a signed url of the result.
+
+        A previous result of the same source content and options is reused as
+        long as it wasn't overwritten since. The time waited for the scheduler
+        is measured as the ``queue`` stage; without ``wait``, conversions that
+        can't start right away are refused.
+
+        :raises errors.Overloaded: if the scheduler has no room for it.
+        """
+        info = await self.storage.stat(source)
+        key = conversion.cache_key(source, info.generation, options) if info else None
+        cached = self.results.get(key) if key else None
+        if key and cached:
+            output = await self.storage.stat(cached["path"])
+            if output and output.generation == cached["generation"]:
+                metrics.RESULT_CACHE.labels("hit").inc()
+                url = await self.storage.generate_signed_url(
+                    cached["path"], mimetype="application/xml+xes", method="GET"
+                )
+                return url, ConversionStats(cached=True)
+            self.results.delete(key)
+        if key:
+            metrics.RESULT_CACHE.labels("miss").inc()
+
+        queued = time.perf_counter()
+        async with self.scheduler.admit(info.size if info else 0, wait=wait):
+            waited = time.perf_counter() - queued
+            try:
+                with metrics.CONVERSIONS_IN_PROGRESS.track_inprogress():
+                    stats = await self.executor.run(
+                        conversion.convert,
+                        functools.partial(self.storage.open_read, source),
+                        functools.partial(
+                            self.storage.open_write, target, "application/xml+xes"
+                        ),
+                        options,
+                    )
+            except Exception:
+                metrics.CONVERSIONS.labels("failed").inc()
+                raise
+        stats.stages["queue"] = waited
+        if key and (output := await self.storage.stat(target)):
+            self.results.set(key, {"path": target, "generation": output.generation})
+        url = await self.storage.generate_signed_url(
+            target, mimetype="application/xml+xes", method="GET"
+        )
+        return url, stats
+
+    def options(
+        self, keys: dict[str, str], delimiter: str, presorted: bool
+    ) -> conversion.ConversionOptions:
+        """Options of a conversion, tuned by the settings."""
+        settings = self.settings
+        return conversion.ConversionOptions(
+            keys=keys,
+            delimiter=delimiter,
+            presorted=presorted,
+            batch_size=int(
+                settings.get("ingest_batch_size", ingest.DEFAULT_BATCH_SIZE)
+            ),
+            grouping_memory_budget=int(settings.get("grouping_memory_budget", "0")),
+            grouping_partitions=int(settings.get("grouping_partitions", "64")),
+            grouping_spill_dir=settings.get("grouping_spill_dir") or None,
+            serialization_workers=int(settings.get("serialization_workers", "1")),
+            serialization_shard_size=int(
+                settings.get("serialization_shard_size", "1000")
+            ),
+            infer_types=settings.get("infer_types", "true").lower() == "true",
+        )
+
+    @staticmethod
+    def locate(file_url: str) -> tuple[str, str]:
+        """Map the url of a file to its ``gs://`` uri and the path of its XES."""
+        _, file_name = file_url.rsplit("/", 1)
+        file_stripped = (
+            file_url.replace("https://", "")
+            .replace("http://", "")
+            .replace("storage.googleapis.com/", "")
+            .replace("storage.cloud.google.com/", "")
+        )
+        return f"gs://{file_stripped}", f"{file_name.rsplit('.')[0]}.xes"
+
+    def _is_done(self, task_id: uuid.UUID, message_id: str) -> bool:
+        task = self.tasks.get(task_id)
+        if task and task.get("status") == "done":
+            logger.info("Task %s is done, skipping message %s.", task_id, message_id)
+            return True
+        return False
+
+    @contextlib.asynccontextmanager
+    async def _lease(
+        self, task_id: uuid.UUID, message_id: str
+    ) -> collections.abc.AsyncIterator[None]:
+        """
+        Hold the lease of a task, renewing it until done.
+
+        The lease expires ``task_lease_ttl`` seconds after the last renewal, so
+        the task can be taken over if its holder dies.
+
+        :raises errors.InProgress: if the task is leased already.
+        """
+        ttl = float(self.settings.get("task_lease_ttl", "300"))
+        key = f"lease:{task_id}"
+        lease = {"message_id": message_id}
+        if not self.tasks.add(key, lease, ttl=ttl):
+            logger.info("Task %s is in progress, message %s.", task_id, message_id)
+            raise errors.InProgress("task")
+
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(ttl / 3)
+                self.tasks.set(key, lease, ttl=ttl)
+
+        renewal = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            renewal.cancel()
+            self.tasks.delete(key)
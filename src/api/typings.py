@@ -4,6 +4,7 @@ Module containing custom typings.
 
 from __future__ import annotations
 
+import dataclasses
 import typing
 
 Settings = typing.NewType("Settings", dict[str, str])
@@ -13,3 +14,25 @@ class Message:
     """
     Publisher abstract messages.
     """
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class ObjectInfo:
+    """
+    Metadata of a stored object.
+    """
+
+    size: int
+    generation: str
+    etag: str
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class Delivery:
+    """
+    Message received from a message queue.
+    """
+
+    message_id: str
+    data: bytes
+    attempt: int | None = None
@@ -0,0 +1,65 @@
+"""Module to start the pull based conversion worker.
+
+Consumes the conversion tasks ``/convert`` publishes from a pull subscription,
+as an alternative to having them pushed to ``/_pubsub``::
+
+    python -m api.worker
+"""
+
+import asyncio
+import contextlib
+import logging
+import signal
+
+import injector
+
+from . import dependencies, ports, typings
+from .routers import schemas
+from .service import ConversionService
+
+logger = logging.getLogger(__name__)
+
+
+async def run(container: injector.Injector) -> None:
+    """Consume and convert tasks until cancelled."""
+    consumer = container.get(ports.MessageConsumer)
+    service = container.get(ConversionService)
+
+    async def handle(delivery: typings.Delivery) -> None:
+        body = schemas.AsyncTaskRequest.parse_raw(delivery.data)
+        await service.process(
+            body.task_id,
+            body.url,
+            body.email_address,
+            service.options(body.keys, body.delimiter, body.presorted),
+            delivery.message_id,
+        )
+
+    try:
+        await consumer.consume(handle)
+    finally:
+        await dependencies.close(container)
+
+
+async def serve(container: injector.Injector) -> None:
+    """Run the worker until it's interrupted or terminated."""
+    task = asyncio.current_task()
+    if task is not None:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    logger.info("Worker started.")
+    with contextlib.suppress(asyncio.CancelledError):
+        await run(container)
+    logger.info("Worker stopped.")
+
+
+def main() -> None:
+    """Entry point of the worker."""
+    container = dependencies.create_container()
+    settings = container.get(typings.Settings)
+    logging.basicConfig(level=settings.get("log_level", "INFO").upper())
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(container))
+
+
+if __name__ == "__main__":
+    main()